@@ -0,0 +1,147 @@
+from datetime import date, datetime
+
+from src.utils import DATE_FORMAT, get_card_key
+
+GROUPINGS = ("card", "category")
+TOTAL_KEY = "Все"
+
+
+def get_group_key(transaction, by=None):
+    """
+    Возвращает ключ группировки транзакции.
+
+    Args:
+        transaction (Dict): Транзакция.
+        by (str, optional): Группировка: "card", "category" или None (все расходы).
+
+    Returns:
+        str: Ключ группы или None, если у транзакции нет нужного поля.
+    """
+    if by is None:
+        return TOTAL_KEY
+    if by == "card":
+        return get_card_key(transaction.get('Номер карты'))
+    if by == "category":
+        category = transaction.get('Категория')
+        return category if isinstance(category, str) and category else None
+    raise ValueError(f"Неизвестная группировка: {by}")
+
+
+class SpendingIndex:
+    """
+    Префиксные суммы расходов по дням для быстрых оконных запросов.
+
+    Расходы (операции с отрицательной суммой) раскладываются по календарным дням
+    и группам, после чего по каждой группе строится накопленная сумма. Построение
+    занимает O(n), сумма расходов за любое окно — O(1): prefix[end] - prefix[start].
+    Суммы хранятся в копейках (int64), поэтому разности префиксов точные.
+    """
+
+    def __init__(self, transactions, by=None):
+        """
+        Args:
+            transactions (Iterable[Dict]): Транзакции.
+            by (str, optional): Группировка: "card", "category" или None (все расходы).
+        """
+        import numpy as np
+
+        if by is not None and by not in GROUPINGS:
+            raise ValueError(f"Неизвестная группировка: {by}")
+        self.by = by
+
+        days, keys, amounts = [], [], []
+        key_index = {}
+        for t in transactions:
+            amount = t.get('Сумма операции', 0)
+            if not amount < 0:  # Пропускаем пополнения и пустые суммы
+                continue
+            key = get_group_key(t, by)
+            if key is None:
+                continue
+            try:
+                day = datetime.strptime(t['Дата операции'], DATE_FORMAT).toordinal()
+            except (KeyError, TypeError, ValueError):
+                continue
+            days.append(day)
+            keys.append(key_index.setdefault(key, len(key_index)))
+            amounts.append(round(-amount * 100))
+
+        self.keys = list(key_index)
+        self._key_index = key_index
+        self.first_day = min(days) if days else 0
+        self.n_days = max(days) - self.first_day + 1 if days else 0
+
+        daily = np.zeros((len(self.keys), self.n_days), dtype=np.int64)
+        np.add.at(daily, (np.asarray(keys, dtype=np.intp), np.asarray(days, dtype=np.intp) - self.first_day), amounts)
+        # prefix[k, d] — расходы группы k за первые d дней, в копейках
+        self._prefix = np.zeros((len(self.keys), self.n_days + 1), dtype=np.int64)
+        np.cumsum(daily, axis=1, out=self._prefix[:, 1:])
+
+    @property
+    def dates(self):
+        """Список дат, покрытых индексом."""
+        return [date.fromordinal(self.first_day + i) for i in range(self.n_days)]
+
+    def _position(self, day):
+        # Индекс в префиксном массиве для порядкового номера дня
+        return min(max(day - self.first_day + 1, 0), self.n_days)
+
+    def window_sum(self, end, window, key=TOTAL_KEY):
+        """
+        Возвращает сумму расходов группы за window дней, заканчивая датой end включительно.
+
+        Args:
+            end (date | datetime): Последний день окна.
+            window (int): Длина окна в днях.
+            key (str): Группа (последние цифры карты, категория или TOTAL_KEY).
+
+        Returns:
+            float: Сумма расходов; 0 для неизвестной группы или окна вне данных.
+        """
+        if window < 1:
+            raise ValueError("Длина окна должна быть положительной")
+        row = self._key_index.get(key)
+        if row is None:
+            return 0.0
+        end_day = end.toordinal()
+        total = self._prefix[row, self._position(end_day)] - self._prefix[row, self._position(end_day - window)]
+        return int(total) / 100
+
+    def rolling(self, window):
+        """
+        Скользящие суммы расходов по всем дням и группам.
+
+        Args:
+            window (int): Длина окна в днях.
+
+        Returns:
+            pd.DataFrame: Индекс — даты, столбцы — группы.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if window < 1:
+            raise ValueError("Длина окна должна быть положительной")
+        stops = np.arange(1, self.n_days + 1)
+        starts = np.maximum(stops - window, 0)
+        values = (self._prefix[:, stops] - self._prefix[:, starts]) / 100
+        if self.n_days:
+            index = pd.date_range(date.fromordinal(self.first_day), periods=self.n_days, freq="D", name="date")
+        else:
+            index = pd.DatetimeIndex([], name="date")
+        return pd.DataFrame(values.T, index=index, columns=self.keys)
+
+
+def rolling_spending(transactions, window, by=None):
+    """
+    Считает скользящие суммы расходов за window дней.
+
+    Args:
+        transactions (Iterable[Dict]): Транзакции.
+        window (int): Длина окна в днях (например, 7, 30 или 90).
+        by (str, optional): Группировка: "card", "category" или None (все расходы).
+
+    Returns:
+        pd.DataFrame: Индекс — календарные даты, столбцы — группы.
+    """
+    return SpendingIndex(transactions, by).rolling(window)
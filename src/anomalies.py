@@ -0,0 +1,307 @@
+import logging
+import math
+import os
+import pickle
+
+from src.analytics import get_group_key
+from src.utils import get_transaction_date, save_cache, sort_by_date
+
+STATE_FILE = "anomaly-state.pkl"
+
+
+class RunningStats:
+    """Среднее и дисперсия потока значений по алгоритму Уэлфорда за O(1) памяти."""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        """Добавляет значение в статистику."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """Выборочная дисперсия (0, пока значений меньше двух)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        """Выборочное стандартное отклонение."""
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """
+    Приближенный квантиль потока по алгоритму P² (Jain, Chlamtac).
+
+    Хранит пять маркеров вместо всех значений: память и время обновления O(1).
+    """
+
+    __slots__ = ("p", "_heights", "_positions", "_desired", "_increments")
+
+    def __init__(self, p):
+        """
+        Args:
+            p (float): Уровень квантиля, от 0 до 1 (например, 0.99).
+        """
+        if not 0 < p < 1:
+            raise ValueError("Уровень квантиля должен быть в интервале (0, 1)")
+        self.p = p
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, value):
+        """Добавляет значение в оценку."""
+        q, n = self._heights, self._positions
+        if len(q) < 5:
+            q.append(value)
+            q.sort()
+            return
+
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= value < q[i + 1])
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Сдвигаем средние маркеры к желаемым позициям
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self):
+        """Текущая оценка квантиля или None, если значений еще нет."""
+        q = self._heights
+        if not q:
+            return None
+        if len(q) < 5 or self._positions[4] == 4:  # Пока значений не больше пяти — точный квантиль
+            return q[min(int(round(self.p * (len(q) - 1))), len(q) - 1)]
+        return q[2]
+
+
+class GroupStats:
+    """Статистика расходов одной группы (категории или карты)."""
+
+    __slots__ = ("stats", "quantile")
+
+    def __init__(self, quantile):
+        self.stats = RunningStats()
+        self.quantile = P2Quantile(quantile) if quantile else None
+
+    def update(self, value):
+        self.stats.update(value)
+        if self.quantile:
+            self.quantile.update(value)
+
+
+class AnomalyDetector:
+    """
+    Потоковый поиск необычных расходов по категориям и картам.
+
+    Для каждой категории и карты хранится бегущая статистика (среднее, дисперсия
+    и приближенный квантиль), поэтому память растет только с числом групп,
+    а оценка каждой транзакции выполняется за O(1). Транзакция сравнивается
+    со статистикой, накопленной до нее, и только потом добавляется в нее.
+    Детектор можно сохранить (save_detector) и продолжить с новыми выписками:
+    last_date — дата последней учтенной транзакции.
+    """
+
+    GROUPINGS = ("category", "card")
+
+    def __init__(self, z_threshold=3.0, quantile=0.99, min_count=10):
+        """
+        Args:
+            z_threshold (float): Порог z-оценки, начиная с которого расход считается необычным.
+            quantile (float, optional): Уровень квантиля; расход выше его оценки считается
+                необычным. None отключает проверку по квантилю.
+            min_count (int): Минимум предыдущих расходов группы, чтобы ее статистике можно было доверять.
+        """
+        self.z_threshold = z_threshold
+        self.quantile = quantile
+        self.min_count = min_count
+        self.last_date = None
+        self._groups = {}
+
+    def __len__(self):
+        """Количество отслеживаемых групп."""
+        return len(self._groups)
+
+    def score(self, transaction):
+        """
+        Оценивает транзакцию, не изменяя статистику.
+
+        Args:
+            transaction (Dict): Транзакция.
+
+        Returns:
+            List[Dict]: Оценки по группам транзакции; пустой список для пополнений.
+        """
+        amount = transaction.get('Сумма операции', 0)
+        if not amount < 0:  # Оцениваем только расходы
+            return []
+
+        amount = -amount
+        scores = []
+        for by in self.GROUPINGS:
+            key = get_group_key(transaction, by)
+            group = self._groups.get((by, key)) if key is not None else None
+            if group is None or group.stats.count < self.min_count:
+                continue
+
+            std = group.stats.std
+            z_score = (amount - group.stats.mean) / std if std else 0.0
+            quantile = group.quantile.value if group.quantile else None
+            reasons = []
+            if z_score >= self.z_threshold:
+                reasons.append("z_score")
+            if quantile is not None and amount > quantile:
+                reasons.append("quantile")
+            scores.append({
+                "group": by,
+                "key": key,
+                "mean": round(group.stats.mean, 2),
+                "std": round(std, 2),
+                "z_score": round(z_score, 2),
+                "quantile": None if quantile is None else round(quantile, 2),
+                "reasons": reasons,
+            })
+        return scores
+
+    def update(self, transaction):
+        """
+        Оценивает транзакцию и добавляет ее в статистику.
+
+        Args:
+            transaction (Dict): Транзакция.
+
+        Returns:
+            Dict: Описание аномалии или None, если расход обычный.
+        """
+        scores = self.score(transaction)
+
+        amount = transaction.get('Сумма операции', 0)
+        if amount < 0:
+            for by in self.GROUPINGS:
+                key = get_group_key(transaction, by)
+                if key is None:
+                    continue
+                group = self._groups.get((by, key))
+                if group is None:
+                    group = self._groups[(by, key)] = GroupStats(self.quantile)
+                group.update(-amount)
+
+        flagged = [s for s in scores if s["reasons"]]
+        if not flagged:
+            return None
+        return {
+            "date": transaction.get("Дата операции"),
+            "amount": -amount,
+            "category": transaction.get("Категория"),
+            "description": transaction.get("Описание"),
+            "card": get_group_key(transaction, "card"),
+            "z_score": max(s["z_score"] for s in flagged),
+            "groups": flagged,
+        }
+
+
+def detect_anomalies(transactions, detector=None, presorted=False, since=None):
+    """
+    Находит необычные расходы в наборе транзакций.
+
+    Транзакции просматриваются в хронологическом порядке (выписка хранит их
+    от новых к старым), каждая сравнивается только с более ранними.
+
+    Args:
+        transactions (Iterable[Dict]): Транзакции, например результат load_transactions.
+        detector (AnomalyDetector, optional): Детектор с накопленной статистикой;
+            позволяет продолжать поиск по новым порциям данных.
+        presorted (bool): Транзакции уже упорядочены по времени.
+        since (datetime, optional): Пропускать транзакции не позже этой даты и без даты —
+            например, detector.last_date сохраненного детектора, чтобы повторная передача
+            всей истории не учла уже учтенные транзакции дважды.
+
+    Yields:
+        Dict: Описания найденных аномалий.
+    """
+    if detector is None:
+        detector = AnomalyDetector()
+    if not presorted:
+        transactions = sort_by_date(transactions)
+    for t in transactions:
+        date = get_transaction_date(t)
+        if since is not None and (date is None or date <= since):
+            continue
+        anomaly = detector.update(t)
+        if date is not None and (detector.last_date is None or date > detector.last_date):
+            detector.last_date = date
+        if anomaly:
+            yield anomaly
+
+
+def save_detector(detector, file_path):
+    """Атомарно сохраняет статистику детектора; ее размер зависит только от числа групп."""
+    save_cache(file_path, detector)
+
+
+def load_detector(file_path, z_threshold=3.0, quantile=0.99, min_count=10):
+    """
+    Загружает сохраненный детектор или создает новый.
+
+    Пороги z_threshold и min_count применяются к сохраненной статистике как есть.
+    Если уровень квантиля другой, накопленные оценки квантиля не подходят,
+    и детектор создается заново.
+
+    Args:
+        file_path (str): Путь к файлу состояния.
+        z_threshold (float): Порог z-оценки.
+        quantile (float, optional): Уровень квантиля или None.
+        min_count (int): Минимум предыдущих расходов группы.
+
+    Returns:
+        AnomalyDetector: Детектор с накопленной статистикой или новый.
+    """
+    if os.path.exists(file_path):
+        try:
+            with open(file_path, "rb") as f:
+                detector = pickle.load(f)
+            if not isinstance(detector, AnomalyDetector):
+                raise TypeError(f"unexpected state type {type(detector).__name__}")
+            if detector.quantile == quantile:
+                detector.z_threshold = z_threshold
+                detector.min_count = min_count
+                return detector
+            logging.info(f"Anomaly state {file_path} uses quantile {detector.quantile}, starting over")
+        except Exception as e:
+            logging.warning(f"Anomaly state read error: {e}")
+    return AnomalyDetector(z_threshold=z_threshold, quantile=quantile, min_count=min_count)
@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+
+from src.analytics import get_group_key
+from src.utils import get_transaction_date, sort_by_date
+
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+
+def load_budgets(file_path):
+    """
+    Загружает настройки бюджетов из JSON-файла.
+
+    Формат: {"thresholds": [0.8, 1.0], "categories": {"Такси": 3000}, "cards": {"7197": 50000}}.
+
+    Returns:
+        Dict: Настройки или пустой словарь при ошибке.
+    """
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Error loading budgets: {e}")
+        return {}
+
+
+class BudgetTracker:
+    """
+    Месячные бюджеты по категориям и картам с уведомлениями о превышении порогов.
+
+    Для каждой группы с бюджетом хранится накопленная сумма расходов за месяц
+    и число уже пройденных порогов, поэтому каждая транзакция обрабатывается
+    за O(1) без пересчета месяца. Каждый порог срабатывает один раз за месяц.
+    Методы потокобезопасны.
+    """
+
+    def __init__(self, categories=None, cards=None, thresholds=DEFAULT_THRESHOLDS):
+        """
+        Args:
+            categories (Dict[str, float], optional): Месячные бюджеты по категориям.
+            cards (Dict[str, float], optional): Месячные бюджеты по картам (последние 4 цифры).
+            thresholds (Iterable[float]): Доли бюджета, при достижении которых выдается уведомление.
+        """
+        self.limits = {}
+        for key, limit in (categories or {}).items():
+            self.limits[("category", key)] = limit
+        for key, limit in (cards or {}).items():
+            self.limits[("card", str(key)[-4:])] = limit
+        if any(limit <= 0 for limit in self.limits.values()):
+            raise ValueError("Бюджет должен быть положительным")
+        self.thresholds = sorted(thresholds)
+        # (группа, ключ, год, месяц) -> [потрачено, число пройденных порогов]
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Создает трекер из настроек (см. load_budgets)."""
+        return cls(categories=config.get("categories"), cards=config.get("cards"),
+                   thresholds=config.get("thresholds", DEFAULT_THRESHOLDS))
+
+    def add(self, transaction):
+        """
+        Учитывает транзакцию в бюджетах ее категории и карты.
+
+        Args:
+            transaction (Dict): Транзакция.
+
+        Returns:
+            List[Dict]: Уведомления о пройденных порогах (пустой список, если их нет).
+        """
+        amount = transaction.get('Сумма операции', 0)
+        if not amount < 0:  # Пополнения не расходуют бюджет
+            return []
+        date = get_transaction_date(transaction)
+        if date is None:
+            return []
+
+        alerts = []
+        for by in ("category", "card"):
+            key = get_group_key(transaction, by)
+            limit = self.limits.get((by, key))
+            if limit is None:
+                continue
+            with self._lock:
+                state = self._totals.setdefault((by, key, date.year, date.month), [0.0, 0])
+                state[0] += -amount
+                spent = state[0]
+                while state[1] < len(self.thresholds) and spent >= self.thresholds[state[1]] * limit:
+                    alerts.append({
+                        "date": transaction['Дата операции'],
+                        "month": f"{date.year}-{date.month:02d}",
+                        "group": by,
+                        "key": key,
+                        "threshold": self.thresholds[state[1]],
+                        "limit": limit,
+                        "spent": round(spent, 2),
+                        "percent": round(spent / limit * 100, 1),
+                    })
+                    state[1] += 1
+        return alerts
+
+    def spent(self, by, key, year, month):
+        """Возвращает расходы группы за месяц."""
+        with self._lock:
+            state = self._totals.get((by, key, year, month))
+        return round(state[0], 2) if state else 0.0
+
+    def status(self, year, month):
+        """
+        Возвращает состояние всех бюджетов за месяц.
+
+        Returns:
+            List[Dict]: Бюджет, расходы и процент использования по каждой группе.
+        """
+        result = []
+        for (by, key), limit in self.limits.items():
+            spent = self.spent(by, key, year, month)
+            result.append({"group": by, "key": key, "limit": limit, "spent": spent,
+                           "percent": round(spent / limit * 100, 1)})
+        return result
+
+
+def check_budgets(transactions, tracker, presorted=False):
+    """
+    Проводит транзакции через трекер бюджетов в хронологическом порядке.
+
+    Args:
+        transactions (Iterable[Dict]): Транзакции, например результат load_transactions.
+        tracker (BudgetTracker): Трекер; его суммы продолжают накапливаться между вызовами.
+        presorted (bool): Транзакции уже упорядочены по времени.
+
+    Yields:
+        Dict: Уведомления о пройденных порогах.
+    """
+    if not presorted:
+        transactions = sort_by_date(transactions)
+    for t in transactions:
+        yield from tracker.add(t)
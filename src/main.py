@@ -1,50 +1,437 @@
-import pandas as pd
-
-import utils
-import services
-import reports
-from datetime import datetime
+import argparse
+import io
 import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+
+from src import (analytics, anomalies, budgets, normalization, precompute, reports, services, snapshot, utils,
+                 views)
+from src.serialization import FORMATS, get_orjson, write_records
+
+logger = logging.getLogger(__name__)
+
+# Состояние рабочего процесса для пакетной генерации отчетов
+_worker_state = {}
+
+
+def parse_date(value, end_of_day=False):
+    """
+    Разбирает дату из аргумента командной строки.
+
+    Args:
+        value (str): Дата в формате YYYY-MM-DD или YYYY-MM-DD HH:MM:SS.
+        end_of_day (bool): Для даты без времени вернуть конец дня, а не его начало.
+
+    Returns:
+        datetime: Разобранная дата.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        pass
+    try:
+        date = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Неверный формат даты: {value}")
+    return date.replace(hour=23, minute=59, second=59) if end_of_day else date
+
+
+def parse_end_date(value):
+    """Разбирает дату окончания периода (дата без времени означает конец дня)."""
+    return parse_date(value, end_of_day=True)
+
+
+def load(args):
+    """
+    Загружает транзакции с учетом настроек кэша; каталог или шаблон --file загружается параллельно.
+
+    Отсутствующий или поврежденный файл — ошибка команды, а не пустой результат.
+    """
+    if args.snapshot:
+        # Из снимка восстанавливаются только строки периода; порядок — от новых к старым, как в выписке
+        with snapshot.Snapshot(args.snapshot) as snap:
+            return snap.to_transactions(getattr(args, "start", None), getattr(args, "end", None))[::-1]
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.file and not os.path.isfile(args.file):
+        return utils.load_statements(args.file, cache_dir=cache_dir, workers=args.workers, strict=True)
+    return utils.load_transactions(args.file, cache_dir=cache_dir, strict=True)
+
+
+@contextmanager
+def open_output(path):
+    """Открывает файл вывода или возвращает stdout."""
+    if not path or path == "-":
+        yield sys.stdout
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        yield f
+
+
+def run_parallel(func, items, workers, initializer=None, initargs=()):
+    """
+    Применяет функцию к элементам, при workers > 1 — в пуле процессов.
+
+    Результаты отдаются по мере готовности в исходном порядке.
+    """
+    if (workers or 1) <= 1:
+        if initializer:
+            initializer(*initargs)
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        yield from executor.map(func, items)
+
+
+def _init_report_worker(transactions, exchange_rates, stock_prices, snapshot_path=None):
+    _worker_state.clear()
+    _worker_state.update(transactions=transactions, exchange_rates=exchange_rates, stock_prices=stock_prices)
+    if snapshot_path:
+        # Процесс отображает снимок в память вместо получения копии всех транзакций;
+        # контрольная сумма уже проверена в родительском процессе
+        _worker_state["snapshot"] = snapshot.Snapshot(snapshot_path, verify=False)
+
+
+def _close_report_worker(reports):
+    # При workers <= 1 состояние «рабочего процесса» живет в текущем процессе: закрываем снимок после отчетов
+    try:
+        yield from reports
+    finally:
+        snap = _worker_state.pop("snapshot", None)
+        if snap is not None:
+            snap.close()
+        _worker_state.clear()
+
+
+def _report_for_date(date):
+    date_str = date.strftime("%Y-%m-%d %H:%M:%S")
+    state = dict(_worker_state)
+    snap = state.pop("snapshot", None)
+    if snap is not None:
+        start_of_month = date.replace(day=1, hour=0, minute=0, second=0)
+        state["transactions"] = snap.to_transactions(start_of_month, date)[::-1]
+    return {"date": date_str, **views.generate_report(date_str, **state)}
+
+
+def _ingest_file(file_path, cache_dir=None):
+    cached = bool(cache_dir) and os.path.exists(file_path) and \
+        os.path.exists(utils.get_cache_path(file_path, cache_dir))
+    transactions = utils.load_transactions(file_path, cache_dir=cache_dir)
+    return {"file": file_path, "rows": len(transactions), "cached": cached}
+
+
+def report_dates(args):
+    """Возвращает даты для пакетной генерации отчетов."""
+    if args.date:
+        return args.date
+    if args.start or args.end:
+        end = args.end or datetime.now().replace(hour=23, minute=59, second=59, microsecond=0)
+        start = args.start or end
+        days = (end.date() - start.date()).days
+        return [end - timedelta(days=i) for i in range(days, -1, -1)]
+    return [datetime.now().replace(microsecond=0)]
+
+
+def cmd_report(args):
+    if args.snapshot:
+        snapshot.Snapshot(args.snapshot).close()  # Проверяем снимок один раз до запуска процессов
+        transactions = []
+    else:
+        transactions = load(args)
+    if args.offline:
+        exchange_rates, stock_prices = {}, []
+    else:
+        exchange_rates, stock_prices = utils.get_exchange_rates(), utils.get_sp500_data()
+    return _close_report_worker(run_parallel(_report_for_date, report_dates(args), args.workers,
+                                             _init_report_worker,
+                                             (transactions, exchange_rates, stock_prices, args.snapshot)))
+
+
+def cmd_search(args):
+    aliases = normalization.load_aliases(args.aliases) if args.aliases else None
+    if not args.snapshot and not args.no_cache and (not args.file or os.path.isfile(args.file)):
+        # Нормализованная таблица берется из дискового кэша и не строится при каждом поиске
+        source = normalization.load_table(args.file, cache_dir=args.cache_dir, aliases=aliases, strict=True)
+    elif aliases:
+        source = normalization.TransactionTable(load(args), aliases)
+    else:
+        # Без кэша разовый поиск быстрее простым перебором, чем построением таблицы
+        source = load(args)
+    return utils.filter_transactions_by_date(services.find_transactions(args.query, source), args.start, args.end)
+
+
+def cmd_weekday(args):
+    import pandas as pd
+
+    totals = reports.weekday_totals(pd.DataFrame(load(args)), args.date)
+    return ({"weekday": day, "amount": amount} for day, amount in totals.items())
+
+
+def cmd_cards(args):
+    transactions = utils.filter_transactions_by_date(load(args), args.start, args.end)
+    return views.get_card_stats(transactions)
+
 
+def cmd_rolling(args):
+    rolling = analytics.rolling_spending(load(args), args.window, args.by)
+    rolling = rolling.loc[args.start:args.end]
+    long = rolling.stack().rename("amount").reset_index()
+    long.columns = ["date", "group", "amount"]
+    long["date"] = long["date"].dt.strftime("%Y-%m-%d")
+    return long
 
-def main():
-    """Основная функция для запуска анализа транзакций."""
 
-    print("=== Загрузка транзакций из Excel-файла ===")
-    transactions = utils.load_transactions()
-    print(f"Загружено {len(transactions)} транзакций")
-    print(json.dumps(transactions[:2], indent=2, ensure_ascii=False))  # Пример первых 2 транзакций
+def create_detector(args):
+    """Создает детектор аномалий по параметрам командной строки."""
+    return anomalies.AnomalyDetector(z_threshold=args.z_threshold, quantile=args.quantile or None,
+                                     min_count=args.min_count)
 
-    print("\n=== Получение курсов валют ===")
-    exchange_rates = utils.get_exchange_rates()
-    print(f"Курсы валют (USD): {json.dumps(exchange_rates, indent=2, ensure_ascii=False)}")
 
-    print("\n=== Получение данных о S&P 500 ===")
-    sp500_data = utils.get_sp500_data()
-    print(f"S&P 500: {json.dumps(sp500_data, indent=2, ensure_ascii=False)}")
+def cmd_anomalies(args):
+    transactions = utils.filter_transactions_by_date(load(args), args.start, args.end)
+    return anomalies.detect_anomalies(transactions, create_detector(args))
 
-    print("\n=== Фильтрация транзакций по дате ===")
-    date_str = input("Введите дату фильтрации (YYYY-MM-DD HH:MM:SS): ")
+
+def parse_month(value):
+    """Разбирает месяц в формате YYYY-MM."""
     try:
-        target_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-        filtered = [t for t in transactions if
-                    datetime.strptime(t['Дата операции'], "%d.%m.%Y %H:%M:%S") <= target_date]
-        print(f"Найдено {len(filtered)} транзакций до {date_str}")
-        print(json.dumps(filtered[:2], indent=2, ensure_ascii=False))  # Пример первых 2 транзакций
+        date = datetime.strptime(value, "%Y-%m")
     except ValueError:
-        print("Ошибка: Неверный формат даты")
+        raise argparse.ArgumentTypeError(f"Неверный формат месяца: {value}")
+    return date.year, date.month
+
+
+def create_budget_tracker(config_path):
+    """Создает трекер бюджетов по файлу настроек."""
+    config = budgets.load_budgets(config_path)
+    if not config:
+        raise ValueError(f"Нет настроек бюджетов в {config_path}")
+    return budgets.BudgetTracker.from_config(config)
+
+
+def cmd_budgets(args):
+    tracker = create_budget_tracker(args.config)
+    transactions = utils.filter_transactions_by_date(load(args), args.start, args.end)
+    alerts = budgets.check_budgets(transactions, tracker)
+    if not args.month:
+        return alerts
+    list(alerts)  # Уведомления не нужны, только накопленные суммы
+    return tracker.status(*args.month)
+
+
+def cmd_ingest(args):
+    cache_dir = None if args.no_cache else args.cache_dir
+    files = utils.find_statement_files(args.files or [args.file or utils.DEFAULT_FILE])
+    load_file = partial(utils.load_transactions, cache_dir=cache_dir, strict=True)
+    if args.save_snapshot:
+        loaded = run_parallel(load_file, files, args.workers)
+        rows = snapshot.write_snapshot((t for transactions in loaded for t in transactions), args.save_snapshot)
+        return [{"snapshot": args.save_snapshot, "files": len(files), "rows": rows}]
+    if not args.anomalies and not args.budgets:
+        return run_parallel(partial(_ingest_file, cache_dir=cache_dir), files, args.workers)
+
+    # Файлы разбираются параллельно; детектор или трекер бюджетов проходит по всем выпискам сразу
+    # в хронологическом порядке, иначе более поздние операции одного файла были бы учтены раньше
+    # ранних из другого
+    loaded = run_parallel(load_file, files, args.workers)
+    transactions = utils.sort_by_date(t for transactions in loaded for t in transactions)
+    if args.budgets:
+        return budgets.check_budgets(transactions, create_budget_tracker(args.budgets), presorted=True)
+    state_path = args.anomaly_state or (os.path.join(cache_dir, anomalies.STATE_FILE) if cache_dir else None)
+    if not state_path:
+        return anomalies.detect_anomalies(transactions, create_detector(args), presorted=True)
+    # Статистика прошлых запусков продолжается: оцениваются только транзакции новее сохраненных
+    detector = anomalies.load_detector(state_path, z_threshold=args.z_threshold, quantile=args.quantile or None,
+                                       min_count=args.min_count)
+    return _detect_and_save(transactions, detector, state_path)
+
+
+def _detect_and_save(transactions, detector, state_path):
+    yield from anomalies.detect_anomalies(transactions, detector, presorted=True, since=detector.last_date)
+    # Состояние сохраняется, только если все транзакции обработаны
+    anomalies.save_detector(detector, state_path)
+
+
+def cmd_bench(args):
+    """Замеряет время основных этапов: разбор Excel, чтение кэша, отчет, поиск и сериализацию."""
+    import pandas as pd
+
+    file_path = args.file or utils.DEFAULT_FILE
+
+    def measure(stage, func):
+        best, result = None, None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        rows = result if isinstance(result, int) else len(result) if hasattr(result, "__len__") else None
+        return {"stage": stage, "seconds": round(best, 6), "rows": rows}
+
+    transactions = utils.load_transactions(file_path, cache_dir=args.cache_dir)
+    if transactions:
+        date_str = datetime.strptime(transactions[0]["Дата операции"], utils.DATE_FORMAT).strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    yield measure("excel_parse", lambda: utils.load_transactions(file_path))
+    yield measure("cache_load", lambda: utils.load_transactions(file_path, cache_dir=args.cache_dir))
+    yield measure("report", lambda: views.generate_report(date_str, transactions, {}, []))
+
+    # Фоновый расчет отчетов за последние дни и выдача готового отчета
+    precomputer = precompute.ReportPrecomputer(transactions, {}, [])
+
+    def report_precompute():
+        precomputer.update(transactions=transactions)
+        return precomputer.precompute()
+
+    yield measure(f"report_precompute_{precomputer.days}", report_precompute)
+    report_day = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S").date()
+    yield measure("report_cached", lambda: precomputer.report(report_day))
+    yield measure("search", lambda: list(services.find_transactions("такси", transactions)))
+
+    def serialize_indent():
+        # Прежний способ вывода: json.dumps с отступами целиком в памяти
+        json.dumps(transactions, indent=2, ensure_ascii=False).encode("utf-8")
+        return len(transactions)
+
+    frame = pd.DataFrame(transactions)
+    backend = "orjson" if get_orjson() else "json"
+    yield measure("serialize_indent", serialize_indent)
+    yield measure(f"serialize_records_{backend}", lambda: write_records(transactions, io.BytesIO(), "json"))
+    yield measure("serialize_frame", lambda: write_records(frame, io.BytesIO(), "json"))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "transactions.snap")
+        yield measure("snapshot_write", lambda: snapshot.write_snapshot(transactions, snapshot_path))
+
+        def snapshot_load():
+            with snapshot.Snapshot(snapshot_path) as snap:
+                return snap.to_transactions()
 
-    print("\n=== Поиск транзакций ===")
-    search_query = input("Введите строку для поиска: ")
-    search_result = services.search_transactions(search_query, transactions)
-    print(f"Результаты поиска для '{search_query}': {search_result}")
+        yield measure("snapshot_load", snapshot_load)
 
-    print("\n=== Отчет по дням недели ===")
-    date_filter = input("Введите дату для фильтрации отчета (YYYY-MM-DD, Enter для пропуска): ")
-    df = pd.DataFrame(transactions)
-    weekday_report = reports.spending_by_weekday(df, date_filter or None)
-    print(f"Расходы по дням недели: {weekday_report}")
+    if args.statements:
+        # Разбор нескольких выписок: последовательно и в пуле процессов, без кэша
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(args.statements):
+                shutil.copy(file_path, os.path.join(tmp_dir, f"statement_{i:02d}.xlsx"))
+            yield measure(f"load_{args.statements}_sequential", lambda: utils.load_statements(tmp_dir, workers=1))
+            workers = args.workers or os.cpu_count() or 1
+            yield measure(f"load_{args.statements}_parallel_{workers}",
+                          lambda: utils.load_statements(tmp_dir, workers=workers))
+
+
+def build_parser():
+    """Создает парсер аргументов командной строки."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--file", help="Excel-файл, каталог или шаблон выписок (по умолчанию data/operations.xlsx)")
+    common.add_argument("--snapshot", help="бинарный снимок транзакций (см. ingest --save-snapshot) вместо --file")
+    common.add_argument("--cache-dir", default=os.getenv(utils.CACHE_DIR_ENV, utils.DEFAULT_CACHE_DIR),
+                        help=f"каталог дискового кэша (переменная окружения {utils.CACHE_DIR_ENV})")
+    common.add_argument("--no-cache", action="store_true", help="не использовать дисковый кэш")
+    common.add_argument("--format", choices=FORMATS, default="json", help="формат вывода")
+    common.add_argument("-o", "--output", help="файл вывода (по умолчанию stdout)")
+    common.add_argument("--workers", type=int,
+                        help="число рабочих процессов (по умолчанию 1, для каталога выписок — по числу ядер)")
+    common.add_argument("-v", "--verbose", action="store_true", help="подробное логирование")
+
+    period = argparse.ArgumentParser(add_help=False)
+    period.add_argument("--start", type=parse_date, help="начало периода (YYYY-MM-DD[ HH:MM:SS])")
+    period.add_argument("--end", type=parse_end_date, help="конец периода (YYYY-MM-DD[ HH:MM:SS])")
+
+    detection = argparse.ArgumentParser(add_help=False)
+    detection.add_argument("--z-threshold", type=float, default=3.0, help="порог z-оценки для аномалий")
+    detection.add_argument("--quantile", type=float, default=0.99, help="уровень квантиля (0 — не проверять)")
+    detection.add_argument("--min-count", type=int, default=10, help="минимум расходов группы для оценки")
+
+    parser = argparse.ArgumentParser(prog="banking", description="Анализ банковских транзакций")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report = subparsers.add_parser("report", parents=[common, period], help="отчеты на даты")
+    report.add_argument("--date", type=parse_end_date, action="append",
+                        help="дата отчета; можно указать несколько раз")
+    report.add_argument("--offline", action="store_true", help="не запрашивать курсы валют и акции")
+    report.set_defaults(handler=cmd_report)
+
+    search = subparsers.add_parser("search", parents=[common, period], help="поиск транзакций")
+    search.add_argument("query", help="строка поиска по описанию или категории")
+    search.add_argument("--aliases", help='JSON-файл синонимов мерчантов {"синоним": "название"}')
+    search.set_defaults(handler=cmd_search)
+
+    weekday = subparsers.add_parser("weekday", parents=[common], help="суммы операций по дням недели")
+    weekday.add_argument("--date", type=parse_end_date,
+                         help="конец трехмесячного периода (YYYY-MM-DD — весь день или YYYY-MM-DD HH:MM:SS)")
+    weekday.set_defaults(handler=cmd_weekday)
+
+    cards = subparsers.add_parser("cards", parents=[common, period], help="статистика по картам")
+    cards.set_defaults(handler=cmd_cards)
+
+    rolling = subparsers.add_parser("rolling", parents=[common, period], help="скользящие суммы расходов")
+    rolling.add_argument("--window", type=int, default=30, help="длина окна в днях")
+    rolling.add_argument("--by", choices=analytics.GROUPINGS, help="группировка по картам или категориям")
+    rolling.set_defaults(handler=cmd_rolling)
+
+    anomalies_parser = subparsers.add_parser("anomalies", parents=[common, period, detection],
+                                             help="поиск необычных расходов")
+    anomalies_parser.set_defaults(handler=cmd_anomalies)
+
+    budgets_parser = subparsers.add_parser("budgets", parents=[common, period], help="контроль месячных бюджетов")
+    budgets_parser.add_argument("--config", required=True, help="JSON-файл с бюджетами по категориям и картам")
+    budgets_parser.add_argument("--month", type=parse_month,
+                                help="вывести состояние бюджетов за месяц (YYYY-MM) вместо уведомлений")
+    budgets_parser.set_defaults(handler=cmd_budgets)
+
+    ingest = subparsers.add_parser("ingest", parents=[common, detection], help="разбор Excel-файлов в дисковый кэш")
+    ingest.add_argument("files", nargs="*", help="Excel-файлы, каталоги или шаблоны (по умолчанию --file)")
+    monitoring = ingest.add_mutually_exclusive_group()
+    monitoring.add_argument("--anomalies", action="store_true", help="выводить необычные расходы вместо сводки")
+    monitoring.add_argument("--budgets", metavar="CONFIG",
+                            help="выводить уведомления о бюджетах из JSON-файла CONFIG вместо сводки")
+    monitoring.add_argument("--save-snapshot", metavar="PATH",
+                            help="сохранить транзакции всех файлов в бинарный снимок PATH")
+    ingest.add_argument("--anomaly-state", metavar="PATH",
+                        help=f"файл состояния детектора для --anomalies (по умолчанию {anomalies.STATE_FILE} "
+                             "в каталоге кэша)")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    bench = subparsers.add_parser("bench", parents=[common], help="замер времени основных этапов")
+    bench.add_argument("--repeat", type=int, default=3, help="число повторов каждого замера")
+    bench.add_argument("--statements", type=int, default=0,
+                       help="сравнить последовательный и параллельный разбор N копий выписки")
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (List[str], optional): Аргументы; по умолчанию берутся из sys.argv.
+
+    Returns:
+        int: Код возврата.
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    try:
+        records = args.handler(args)
+        with open_output(args.output) as stream:
+            write_records(records, stream, args.format)
+    except Exception as e:
+        logging.error(f"Command {args.command} failed: {e}")
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from src.utils import DEFAULT_FILE, get_cache_path, load_transactions, save_cache
+
+
+def normalize_text(value):
+    """
+    Приводит строку к виду для сравнения: регистр, пробелы, «ё».
+
+    Args:
+        value: Значение ячейки (строка, NaN или None).
+
+    Returns:
+        str: Нормализованная строка; пустая строка для пустых значений.
+    """
+    if not isinstance(value, str):
+        return ""
+    return " ".join(value.casefold().replace("ё", "е").split())
+
+
+def load_aliases(file_path):
+    """
+    Загружает синонимы мерчантов из JSON-файла вида {"синоним": "каноническое название"}.
+
+    Returns:
+        Dict[str, str]: Синонимы или пустой словарь при ошибке.
+    """
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Error loading aliases: {e}")
+        return {}
+
+
+class StringPool:
+    """
+    Словарь интернированных строк.
+
+    Каждое уникальное значение (после нормализации и замены синонимов) получает
+    целочисленный код и хранится один раз. Пустые значения кодируются как -1.
+    """
+
+    MISSING = -1
+
+    def __init__(self, aliases=None):
+        """
+        Args:
+            aliases (Dict[str, str], optional): Синонимы: написание -> каноническое название.
+        """
+        self.values = []  # Отображаемое значение кода — первое встретившееся написание
+        self.keys = []  # Нормализованный ключ кода
+        self._codes = {}
+        self._raw = {}
+        self._aliases = {normalize_text(k): normalize_text(v) for k, v in (aliases or {}).items()}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        """Возвращает единственный экземпляр строки с таким значением."""
+        return self._raw.setdefault(value, value) if isinstance(value, str) else value
+
+    def encode(self, value):
+        """
+        Возвращает код значения, добавляя его в словарь при первом появлении.
+
+        Args:
+            value: Значение ячейки.
+
+        Returns:
+            int: Код значения или MISSING для пустых значений.
+        """
+        key = normalize_text(value)
+        if not key:
+            return self.MISSING
+        key = self._aliases.get(key, key)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(self.intern(value.strip()))
+            self.keys.append(key)
+        return code
+
+    def code(self, value):
+        """Возвращает код значения без добавления в словарь (MISSING, если значения нет)."""
+        key = normalize_text(value)
+        return self._codes.get(self._aliases.get(key, key), self.MISSING)
+
+    def decode(self, code):
+        """Возвращает отображаемое значение кода."""
+        return None if code == self.MISSING else self.values[code]
+
+    def find(self, query):
+        """
+        Ищет коды значений, содержащих строку поиска.
+
+        Просматриваются только уникальные значения, а не все строки выписки.
+
+        Returns:
+            List[int]: Подходящие коды.
+        """
+        query = normalize_text(query)
+        return [code for code, key in enumerate(self.keys) if query in key]
+
+
+class TransactionTable:
+    """
+    Транзакции с описаниями и категориями в виде целочисленных кодов.
+
+    Нормализация (регистр, пробелы, синонимы мерчантов) выполняется один раз
+    при построении; поиск и группировка по мерчанту работают с массивами кодов.
+    Исходные словари не хранятся: каждый столбец записан кодами в словарь его
+    уникальных значений, и словари транзакций собираются заново только для
+    найденных строк (как в Snapshot.to_transactions).
+    """
+
+    ABSENT = -2  # Ключа нет в словаре транзакции
+
+    def __init__(self, transactions, aliases=None):
+        """
+        Args:
+            transactions (List[Dict]): Транзакции, например результат load_transactions.
+            aliases (Dict[str, str], optional): Синонимы мерчантов.
+        """
+        import numpy as np
+
+        self.descriptions = StringPool(aliases)
+        self.categories = StringPool()
+
+        description_codes = np.empty(len(transactions), dtype=np.int32)
+        category_codes = np.empty(len(transactions), dtype=np.int32)
+        amounts = np.empty(len(transactions), dtype=np.float64)
+        columns = {}  # столбец -> (индекс значений, коды строк)
+        for i, t in enumerate(transactions):
+            description_codes[i] = self.descriptions.encode(t.get('Описание'))
+            category_codes[i] = self.categories.encode(t.get('Категория'))
+            amounts[i] = t.get('Сумма операции', 0)
+            for column, value in t.items():
+                if column not in columns:
+                    columns[column] = ({}, [self.ABSENT] * i)
+                index, codes = columns[column]
+                if value != value:
+                    codes.append(StringPool.MISSING)  # NaN
+                else:
+                    # Тип входит в ключ, чтобы 1 и 1.0 не склеивались в одно значение
+                    codes.append(index.setdefault((type(value), value), len(index)))
+            for column, (_, codes) in columns.items():
+                if len(codes) == i:
+                    codes.append(self.ABSENT)
+
+        self.description_codes = description_codes
+        self.category_codes = category_codes
+        self.amounts = amounts
+        self.columns = list(columns)
+        self._values = [[value for _, value in index] for index, _ in columns.values()]
+        self._codes = np.array([codes for _, codes in columns.values()], dtype=np.int32).reshape(
+            len(columns), len(transactions))
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def _rows(self, indices):
+        """Собирает словари транзакций для строк с указанными индексами."""
+        nan = float("nan")
+        result = []
+        for codes in self._codes[:, indices].T.tolist():
+            t = {}
+            for column, values, code in zip(self.columns, self._values, codes):
+                if code >= 0:
+                    t[column] = values[code]
+                elif code == StringPool.MISSING:
+                    t[column] = nan
+            result.append(t)
+        return result
+
+    def to_transactions(self):
+        """
+        Восстанавливает транзакции в формате load_transactions.
+
+        Returns:
+            List[Dict]: Все транзакции в исходном порядке.
+        """
+        import numpy as np
+
+        return self._rows(np.arange(len(self)))
+
+    def find(self, query):
+        """
+        Отбирает транзакции, в описании или категории которых встречается строка поиска.
+
+        Args:
+            query (str): Строка поиска (без учета регистра и лишних пробелов).
+
+        Returns:
+            List[Dict]: Найденные транзакции в исходном порядке.
+        """
+        import numpy as np
+
+        mask = np.isin(self.description_codes, self.descriptions.find(query)) | \
+            np.isin(self.category_codes, self.categories.find(query))
+        return self._rows(np.flatnonzero(mask))
+
+    def by_merchant(self, merchant):
+        """Возвращает транзакции мерчанта с учетом синонимов."""
+        import numpy as np
+
+        code = self.descriptions.code(merchant)
+        if code == StringPool.MISSING:
+            return []
+        return self._rows(np.flatnonzero(self.description_codes == code))
+
+    def spending_by_merchant(self):
+        """
+        Суммирует расходы по мерчантам.
+
+        Returns:
+            Dict[str, float]: Расходы по мерчантам, от больших к меньшим.
+        """
+        import numpy as np
+
+        mask = (self.amounts < 0) & (self.description_codes != StringPool.MISSING)
+        totals = np.bincount(self.description_codes[mask], weights=-self.amounts[mask],
+                             minlength=len(self.descriptions))
+        order = np.argsort(totals)[::-1]
+        return {self.descriptions.values[code]: round(float(totals[code]), 2) for code in order if totals[code] > 0}
+
+
+def get_table_cache_path(file_path, cache_dir, aliases=None):
+    """Возвращает путь к кэшу таблицы: ключ учитывает версию файла и набор синонимов."""
+    aliases_key = json.dumps(aliases or {}, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha1(aliases_key.encode("utf-8")).hexdigest()[:8]
+    return f"{os.path.splitext(get_cache_path(file_path, cache_dir))[0]}-table-{digest}.pkl"
+
+
+def load_table(file_path=None, cache_dir=None, aliases=None, strict=False):
+    """
+    Загружает транзакции и сразу нормализует описания и категории.
+
+    Если задан каталог кэша, готовая таблица (строки, словари и коды) сохраняется
+    в него, и повторные загрузки не повторяют нормализацию.
+
+    Args:
+        file_path (str, optional): Путь к Excel-файлу с транзакциями.
+        cache_dir (str, optional): Каталог дискового кэша.
+        aliases (Dict[str, str], optional): Синонимы мерчантов.
+        strict (bool): Выбрасывать исключение при ошибке загрузки, как в load_transactions.
+
+    Returns:
+        TransactionTable: Нормализованные транзакции.
+    """
+    if not file_path:
+        file_path = DEFAULT_FILE
+
+    cache_path = get_table_cache_path(file_path, cache_dir, aliases) \
+        if cache_dir and os.path.exists(file_path) else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Cache read error: {e}")
+
+    table = TransactionTable(load_transactions(file_path, cache_dir=cache_dir, strict=strict), aliases)
+    if cache_path:
+        save_cache(cache_path, table)
+    return table
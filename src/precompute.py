@@ -0,0 +1,279 @@
+import copy
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+
+from src import views
+from src.reports import weekday_totals
+from src.utils import DATE_FORMAT, get_exchange_rates, get_sp500_data, get_transaction_date
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAYS = 31
+DEFAULT_RETENTION = 90
+EPOCH = datetime(1970, 1, 1)
+
+
+def end_of_day(day):
+    """Возвращает последнюю секунду дня."""
+    return datetime.combine(day, time(23, 59, 59))
+
+
+class ReportStore:
+    """
+    Хранилище готовых отчетов по дням с ограниченным сроком хранения.
+
+    Поиск и добавление выполняются за O(1). Когда отчетов больше max_entries,
+    удаляются те, к которым дольше всего не обращались. Каждый отчет помечен
+    версией данных; отчет устаревшей версии не выдается. Методы потокобезопасны.
+    """
+
+    def __init__(self, max_entries=DEFAULT_RETENTION):
+        """
+        Args:
+            max_entries (int): Максимальное число хранимых отчетов.
+        """
+        if max_entries < 1:
+            raise ValueError("Размер хранилища должен быть положительным")
+        self.max_entries = max_entries
+        self._reports = OrderedDict()  # день -> (версия, отчет)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._reports)
+
+    def __contains__(self, day):
+        with self._lock:
+            return day in self._reports
+
+    def get(self, day, version):
+        """Возвращает отчет за день указанной версии или None."""
+        with self._lock:
+            entry = self._reports.get(day)
+            if entry is None or entry[0] != version:
+                return None
+            self._reports.move_to_end(day)
+            return entry[1]
+
+    def put(self, day, version, report):
+        """Сохраняет отчет за день, вытесняя самые давние при переполнении."""
+        with self._lock:
+            self._reports[day] = (version, report)
+            self._reports.move_to_end(day)
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+
+    def clear(self):
+        """Удаляет все отчеты."""
+        with self._lock:
+            self._reports.clear()
+
+
+class ReportPrecomputer:
+    """
+    Фоновый расчет ежедневных отчетов.
+
+    После загрузки транзакций или обновления курсов фоновый поток заново считает
+    отчеты (карты, топ транзакций, суммы по дням недели, курсы и акции) за
+    последние days дней, и report() выдает их за O(1). Отчет за день, которого
+    нет в хранилище, считается по запросу и тоже сохраняется. Приветствие
+    зависит от текущего времени и добавляется при каждой выдаче.
+    """
+
+    def __init__(self, transactions=None, exchange_rates=None, stock_prices=None, days=DEFAULT_DAYS,
+                 store=None, rates_interval=None):
+        """
+        Args:
+            transactions (List[Dict], optional): Транзакции, например результат load_transactions.
+            exchange_rates (Dict, optional): Курсы валют; None — запросить через API при обновлении курсов.
+            stock_prices (List[Dict], optional): Данные о S&P 500; None — запросить через API.
+            days (int): Число дней, отчеты за которые считаются заранее (до даты последней транзакции).
+            store (ReportStore, optional): Хранилище отчетов; по умолчанию на DEFAULT_RETENTION дней.
+            rates_interval (float, optional): Период обновления курсов в фоновом потоке, в секундах.
+        """
+        self.days = days
+        self.store = store if store is not None else ReportStore()
+        self.rates_interval = rates_interval
+        self._version = 0
+        self._data = None
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.update(transactions or [], exchange_rates or {}, stock_prices or [])
+
+    @property
+    def version(self):
+        """Версия данных; увеличивается при каждом обновлении."""
+        with self._lock:
+            return self._version
+
+    def update(self, transactions=None, exchange_rates=None, stock_prices=None):
+        """
+        Заменяет транзакции и/или курсы и планирует пересчет отчетов.
+
+        Отчеты прежней версии данных сразу перестают выдаваться. Новые данные
+        готовятся без блокировки читателей: report() и фоновый расчет ждут только
+        замены ссылки на данные.
+        """
+        import pandas as pd
+
+        # Обновления выполняются по одному, чтобы одновременные замены курсов
+        # и транзакций не потеряли друг друга
+        with self._update_lock:
+            with self._lock:
+                old = self._data or {}
+            data = {
+                "transactions": old.get("transactions") if transactions is None else transactions,
+                "exchange_rates": old.get("exchange_rates") if exchange_rates is None else exchange_rates,
+                "stock_prices": old.get("stock_prices") if stock_prices is None else stock_prices,
+            }
+            if transactions is not None or "frame" not in old:
+                frame = pd.DataFrame(data["transactions"], columns=['Дата операции', 'Сумма операции'])
+                # Даты разбираются один раз на версию данных, а не при расчете каждого дня
+                frame['Дата операции'] = pd.to_datetime(frame['Дата операции'], format=DATE_FORMAT, errors="coerce")
+                data["frame"] = frame
+                # Транзакции от новых к старым (как в выписке) с ключами для двоичного поиска месяца
+                dated = [(d, t) for d, t in zip(map(get_transaction_date, data["transactions"]), data["transactions"])
+                         if d is not None]
+                dated.sort(key=lambda item: item[0], reverse=True)
+                data["rows"] = [t for _, t in dated]
+                data["keys"] = [(EPOCH - d).total_seconds() for d, _ in dated]
+                data["last_day"] = dated[0][0].date() if dated else None
+            else:
+                for key in ("frame", "rows", "keys", "last_day"):
+                    data[key] = old[key]
+            with self._lock:
+                self._data = data
+                self._version += 1
+        self._wakeup.set()
+
+    def refresh_rates(self):
+        """Запрашивает курсы валют и цены акций через API и планирует пересчет."""
+        self.update(exchange_rates=get_exchange_rates(), stock_prices=get_sp500_data())
+
+    def precompute_days(self):
+        """Возвращает дни, отчеты за которые считаются заранее, от последнего к первому."""
+        with self._lock:
+            last_day = self._data["last_day"]
+        if last_day is None:
+            return []
+        return [last_day - timedelta(days=i) for i in range(min(self.days, self.store.max_entries))]
+
+    def _compute(self, day, data):
+        target_date = end_of_day(day)
+        start_of_month = target_date.replace(day=1, hour=0, minute=0, second=0)
+        keys = data["keys"]
+        month = data["rows"][bisect_left(keys, (EPOCH - target_date).total_seconds()):
+                             bisect_right(keys, (EPOCH - start_of_month).total_seconds())]
+        report = views.build_report(target_date, month, data["exchange_rates"], data["stock_prices"], filtered=True)
+        try:
+            report["weekday"] = weekday_totals(data["frame"], target_date)
+        except Exception as e:
+            logger.error(f"Weekday report error: {e}")
+            report["weekday"] = {}
+        return report
+
+    def precompute(self):
+        """
+        Считает отчеты за дни из precompute_days для текущей версии данных.
+
+        Расчет прерывается, если данные обновились, — следующий проход начнется заново.
+
+        Returns:
+            int: Количество посчитанных отчетов.
+        """
+        with self._lock:
+            version, data = self._version, self._data
+        computed = 0
+        for day in self.precompute_days():
+            if self.version != version or self._stopped.is_set():
+                break
+            if self.store.get(day, version) is None:
+                self.store.put(day, version, self._compute(day, data))
+                computed += 1
+        return computed
+
+    def report(self, day):
+        """
+        Возвращает отчет за день: готовый за O(1) или посчитанный по запросу.
+
+        Args:
+            day (date | datetime): День отчета.
+
+        Returns:
+            Dict: Отчет в формате views.generate_report с разделом weekday. Это копия:
+                ее изменение не затрагивает отчет в хранилище.
+        """
+        if isinstance(day, datetime):
+            day = day.date()
+        with self._lock:
+            version, data = self._version, self._data
+        report = self.store.get(day, version)
+        if report is None:
+            report = self._compute(day, data)
+            self.store.put(day, version, report)
+        # Отчет небольшой (несколько карт, топ-5, дни недели), поэтому копия не зависит от объема данных
+        return {"greeting": views.get_greeting(), **copy.deepcopy(report)}
+
+    def start(self):
+        """Запускает фоновый поток пересчета."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="report-precompute", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Останавливает фоновый поток."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self._wakeup.wait(self.rates_interval):
+                # Таймаут ожидания — пора обновить курсы; update() снова взведет событие
+                try:
+                    self.refresh_rates()
+                except Exception as e:
+                    logger.error(f"Rates refresh error: {e}")
+                continue
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                computed = self.precompute()
+                logger.info(f"Precomputed {computed} reports (version {self.version})")
+            except Exception as e:
+                logger.error(f"Report precompute error: {e}")
+
+    def wait_idle(self, timeout=None):
+        """
+        Ждет, пока отчеты текущей версии данных будут посчитаны.
+
+        Returns:
+            bool: True, если все отчеты готовы.
+        """
+        deadline = None if timeout is None else datetime.now() + timedelta(seconds=timeout)
+        while True:
+            version = self.version
+            if all(self.store.get(day, version) is not None for day in self.precompute_days()):
+                return True
+            if self._stopped.is_set() or (deadline is not None and datetime.now() >= deadline):
+                return False
+            self._stopped.wait(0.01)
@@ -1,8 +1,39 @@
-import json
 import logging
 
-import pandas as pd
-from win32ctypes.pywin32.pywintypes import datetime
+from src.serialization import dumps
+
+WEEKDAY_NAMES = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+
+
+def weekday_totals(df, date_filter=None):
+    """
+    Считает суммы операций по дням недели.
+
+    Args:
+        df (pd.DataFrame): DataFrame с транзакциями.
+        date_filter (str | datetime, optional): Дата окончания трехмесячного периода
+            (строка YYYY-MM-DD [HH:MM:SS] или datetime). Если не задана, учитываются все транзакции.
+
+    Returns:
+        Dict[str, float]: Суммы операций по дням недели в порядке с понедельника.
+
+    Raises:
+        KeyError: Если в DataFrame нет нужных столбцов.
+        ValueError: Если дату не удалось разобрать.
+    """
+    import pandas as pd
+
+    dates = pd.to_datetime(df['Дата операции'], dayfirst=True)
+    amounts = df['Сумма операции']
+    if date_filter:
+        end_date = pd.to_datetime(date_filter)
+        start_date = end_date - pd.DateOffset(months=3)
+        mask = (dates >= start_date) & (dates <= end_date)
+        dates, amounts = dates[mask], amounts[mask]
+
+    # Названия дней берем из таблицы, а не из системной локали
+    grouped = amounts.groupby(dates.dt.dayofweek).sum()
+    return {WEEKDAY_NAMES[int(day)]: total for day, total in grouped.to_dict().items()}
 
 
 def spending_by_weekday(df, date_filter=None):
@@ -16,23 +47,16 @@ def spending_by_weekday(df, date_filter=None):
     Returns:
         str: JSON-строка с суммарными расходами по дням недели.
     """
-    if not date_filter:
-        date_filter = datetime.now().date()
-        print(date_filter)
     try:
-        if date_filter:
-            start_date = pd.to_datetime(date_filter, dayfirst=True) - pd.DateOffset(months=3)
-
-            df = start_date <= df[pd.to_datetime(df['Дата операции'], dayfirst=True) <= pd.to_datetime(date_filter, dayfirst=True)]
-
-        df['День недели'] = pd.to_datetime(df['Дата операции'], dayfirst=True).dt.day_name(locale="ru")
-        grouped = df.groupby('День недели')['Сумма операции'].sum().to_dict()
-        return json.dumps(grouped, indent=2, ensure_ascii=False)
+        return dumps(weekday_totals(df, date_filter))
     except Exception as e:
         logging.error(f"Weekday report error: {e}")
-        return json.dumps({})
+        return dumps({})
+
 
 if __name__ == "__main__":
+    import pandas as pd
+
     data = {
         "Дата операции": [
             "12.05.2021 13:57:38",  # Понедельник
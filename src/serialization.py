@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from functools import lru_cache
+
+FORMATS = ("json", "ndjson", "csv")
+
+# Размер порции при записи: данные копятся в памяти и сбрасываются в поток крупными блоками
+CHUNK_BYTES = 64 * 1024
+FRAME_CHUNK_ROWS = 10_000
+
+
+@lru_cache(maxsize=None)
+def get_orjson():
+    """Возвращает модуль orjson, если он установлен, иначе None."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def clean_value(value):
+    """Заменяет NaN и NaT (пустые ячейки Excel) на None, чтобы результат был корректным JSON."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, datetime) and value != value:  # pd.NaT не равен сам себе
+        return None
+    return value
+
+
+def clean_record(record):
+    """Возвращает копию записи с очищенными значениями, включая вложенные."""
+    return {k: _clean(v) for k, v in record.items()}
+
+
+def _clean(obj):
+    if isinstance(obj, dict):
+        return clean_record(obj)
+    if isinstance(obj, (list, tuple)):
+        return [_clean(item) for item in obj]
+    return clean_value(obj)
+
+
+def _default(obj):
+    """Сериализует значения NumPy/pandas и даты, которые не поддерживает стандартный кодировщик."""
+    if hasattr(obj, "tolist"):  # numpy.ndarray, numpy-скаляры, pd.Series
+        return _clean(obj.tolist())
+    if hasattr(obj, "isoformat"):  # date, datetime, pd.Timestamp, pd.NaT
+        return None if obj != obj else obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj, pretty=False):
+    """
+    Кодирует объект в JSON (UTF-8).
+
+    По умолчанию вывод компактный. Если установлен orjson, используется он;
+    иначе стандартный json. NaN и NaT на любом уровне вложенности выводятся как null,
+    поэтому оба кодировщика дают одинаковый результат.
+
+    Args:
+        obj: Объект для сериализации.
+        pretty (bool): Форматировать с отступами.
+
+    Returns:
+        bytes: JSON в кодировке UTF-8.
+    """
+    orjson = get_orjson()
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if pretty:
+        return json.dumps(_clean(obj), ensure_ascii=False, indent=2, default=_default).encode("utf-8")
+    return json.dumps(_clean(obj), ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps(obj, pretty=False):
+    """Кодирует объект в JSON-строку (см. dumps_bytes)."""
+    return dumps_bytes(obj, pretty).decode("utf-8")
+
+
+def _byte_writer(stream):
+    """
+    Возвращает функцию записи байтов UTF-8 в поток — текстовый, двоичный или сокет.
+
+    Текстовый поток с нижележащим буфером (stdout, файл) получает байты UTF-8 напрямую,
+    независимо от кодировки, с которой он открыт, — так все форматы выводятся в UTF-8.
+    Для сокета используется sendall, который отправляет блок целиком.
+    """
+    if isinstance(stream, io.TextIOBase):
+        buffer = getattr(stream, "buffer", None)
+        if buffer is not None:
+            # Пишем в нижележащий буфер напрямую, минуя повторное кодирование
+            stream.flush()
+            return buffer.write
+        return lambda data: stream.write(data.decode("utf-8"))
+    if hasattr(stream, "sendall"):
+        return stream.sendall
+    return stream.write
+
+
+def _write_csv(records, stream):
+    # CSV копится в текстовом буфере и выводится блоками байтов UTF-8, как JSON
+    write = _byte_writer(stream)
+    text = io.StringIO()
+    count = 0
+    writer = None
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(text, fieldnames=list(record), extrasaction="ignore")
+            writer.writeheader()
+        # Вложенные структуры в CSV записываем как JSON
+        writer.writerow({k: dumps(v) if isinstance(v, (dict, list)) else clean_value(v) for k, v in record.items()})
+        count += 1
+        if text.tell() >= CHUNK_BYTES:
+            write(text.getvalue().encode("utf-8"))
+            text.seek(0)
+            text.truncate()
+
+    if text.tell():
+        write(text.getvalue().encode("utf-8"))
+    return count
+
+
+def write_frame(df, stream, fmt="json"):
+    """
+    Записывает DataFrame без промежуточного преобразования в список словарей.
+
+    Столбцы кодируются векторизованно средствами pandas порциями по FRAME_CHUNK_ROWS строк.
+
+    Args:
+        df (pd.DataFrame): Данные для вывода.
+        stream: Текстовый или двоичный поток (файл, stdout) или сокет.
+        fmt (str): Формат вывода: json, ndjson или csv.
+
+    Returns:
+        int: Количество записанных строк.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {fmt}")
+
+    write = _byte_writer(stream)
+    if fmt == "json":
+        write(b"[")
+    for start in range(0, len(df), FRAME_CHUNK_ROWS):
+        chunk = df.iloc[start:start + FRAME_CHUNK_ROWS]
+        if fmt == "csv":
+            text = chunk.to_csv(index=False, header=start == 0)
+        elif fmt == "ndjson":
+            text = chunk.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+            text = text if text.endswith("\n") else text + "\n"
+        else:
+            text = chunk.to_json(orient="records", force_ascii=False, date_format="iso")[1:-1]
+            text = "," + text if start else text
+        write(text.encode("utf-8"))
+    if fmt == "csv" and not len(df):
+        write(df.to_csv(index=False).encode("utf-8"))
+    if fmt == "json":
+        write(b"]\n")
+    return len(df)
+
+
+def write_records(records, stream, fmt="json"):
+    """
+    Потоково записывает записи в поток.
+
+    Записи кодируются по одной и сбрасываются в поток блоками, поэтому итоговый
+    список не собирается в памяти. DataFrame записывается через write_frame.
+    Все форматы выводятся в UTF-8.
+
+    Args:
+        records (Iterable[Dict] | pd.DataFrame): Записи для вывода.
+        stream: Текстовый или двоичный поток (stdout, открытый файл) или сокет.
+        fmt (str): Формат вывода: json, ndjson или csv.
+
+    Returns:
+        int: Количество записанных записей.
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {fmt}")
+    if hasattr(records, "to_json"):
+        return write_frame(records, stream, fmt)
+    if fmt == "csv":
+        return _write_csv(records, stream)
+
+    write = _byte_writer(stream)
+    separator = b"\n" if fmt == "ndjson" else b","
+    chunk, size, count = [], 0, 0
+
+    def flush():
+        # JSON-массив: первый блок открывает его, последующие продолжают через запятую
+        if fmt == "ndjson":
+            write(separator.join(chunk) + separator)
+        else:
+            write((b"," if count > len(chunk) else b"[") + separator.join(chunk))
+
+    for record in records:
+        data = dumps_bytes(record)
+        chunk.append(data)
+        size += len(data)
+        count += 1
+        if size >= CHUNK_BYTES:
+            flush()
+            chunk, size = [], 0
+
+    if chunk:
+        flush()
+    if fmt == "json":
+        write(b"]\n" if count else b"[]\n")
+    return count
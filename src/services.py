@@ -1,22 +1,51 @@
-import json
 import logging
 
+from src.normalization import TransactionTable, normalize_text
+from src.serialization import dumps
+
+
+def find_transactions(query, transactions):
+    """
+    Отбирает транзакции, в описании или категории которых встречается строка поиска.
+
+    Args:
+        query (str): Строка поиска.
+        transactions (Iterable[Dict] | TransactionTable): Транзакции для поиска. Для TransactionTable
+            поиск идет по словарю уникальных значений и кодам, без перебора строк.
+
+    Yields:
+        Dict: Найденные транзакции в исходном порядке.
+    """
+    if isinstance(transactions, TransactionTable):
+        yield from transactions.find(query)
+        return
+
+    # Та же нормализация, что и в TransactionTable: регистр, «ё» и лишние пробелы не важны
+    query = normalize_text(query)
+    for t in transactions:
+        description = t.get('Описание', '')
+        category = t.get('Категория', '')
+        # Пустые ячейки Excel приходят как NaN, а не как строки
+        if (isinstance(description, str) and query in normalize_text(description)) or \
+                (isinstance(category, str) and query in normalize_text(category)):
+            yield t
+
+
 def search_transactions(query, transactions):
     """
     Выполняет поиск транзакций по описанию или категории.
 
     Args:
         query (str): Строка поиска.
-        transactions (List[Dict]): Список транзакций для поиска.
+        transactions (List[Dict] | TransactionTable): Список транзакций для поиска.
 
     Returns:
         str: JSON-строка с результатами поиска.
     """
     try:
-        results = [t for t in transactions if query.lower() in t.get('Описание', '').lower()
-                  or query.lower() in t.get('Категория', '').lower()]
+        results = list(find_transactions(query, transactions))
         logging.info(f"Search completed for query: {query}")
-        return json.dumps(results, indent=2, ensure_ascii=False)
+        return dumps(results)
     except Exception as e:
         logging.error(f"Search error: {e}")
-        return json.dumps([])
+        return dumps([])
@@ -0,0 +1,267 @@
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+from src.utils import ACCOUNT_COLUMN, DATE_FORMAT, get_card_key, get_transaction_date
+
+MAGIC = b"BTXSNAP\0"
+VERSION = 2
+# Заголовок: сигнатура, версия, резерв, число секций, число строк, CRC32 данных после заголовка
+HEADER = struct.Struct("<8sHHIQI4x")
+# Описание секции: имя, тип NumPy, смещение от начала файла, число элементов
+SECTION = struct.Struct("<32s8sQQ")
+ALIGNMENT = 64
+
+MISSING_DATE = -(2 ** 63)
+MISSING_CODE = -1
+EPOCH = datetime(1970, 1, 1)
+
+# Столбцы со строками хранятся как коды в словарь уникальных значений
+STRING_COLUMNS = {"accounts": ACCOUNT_COLUMN, "cards": "Номер карты", "categories": "Категория",
+                  "descriptions": "Описание"}
+# Столбцы, которых может не быть в транзакциях: пустое значение не восстанавливается как NaN
+OPTIONAL_COLUMNS = {"accounts"}
+
+
+class SnapshotError(ValueError):
+    """Файл снимка поврежден или имеет неподдерживаемый формат."""
+
+
+def _to_string(value):
+    """Приводит значение ячейки к строке; None для пустых значений (None, NaN)."""
+    if value is None or value != value:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _card_to_string(value):
+    """Номер карты числом (7197.0) сохраняется как последние 4 цифры, а не как "7197.0"."""
+    return value if isinstance(value, str) else get_card_key(value)
+
+
+def _encode_strings(values, convert=_to_string):
+    """Кодирует строки в словарь уникальных значений; пустые значения получают MISSING_CODE."""
+    index, codes = {}, []
+    for value in map(convert, values):
+        codes.append(MISSING_CODE if value is None else index.setdefault(value, len(index)))
+    return codes, list(index)
+
+
+def write_snapshot(transactions, file_path):
+    """
+    Записывает транзакции в бинарный снимок.
+
+    Снимок хранит столбцы фиксированной ширины (даты, суммы, коды счетов, карт,
+    категорий и описаний) и словари строк, упорядоченные по дате операции. Нестроковые
+    значения сохраняются строкой (номер карты числом — последними 4 цифрами). Файл
+    записывается атомарно: сначала во временный файл, затем переименовывается.
+
+    Args:
+        transactions (Iterable[Dict]): Транзакции, например результат load_transactions.
+        file_path (str): Путь к файлу снимка.
+
+    Returns:
+        int: Количество записанных транзакций.
+    """
+    import numpy as np
+
+    rows = []
+    for t in transactions:
+        date = get_transaction_date(t)
+        rows.append((int((date - EPOCH).total_seconds()) if date else MISSING_DATE, t))
+    rows.sort(key=lambda row: row[0])
+
+    columns = {
+        "dates": np.array([date for date, _ in rows], dtype="<i8"),
+        "amounts": np.array([t.get('Сумма операции', float("nan")) for _, t in rows], dtype="<f8"),
+    }
+    for name, column in STRING_COLUMNS.items():
+        codes, values = _encode_strings((t.get(column) for _, t in rows),
+                                        _card_to_string if name == "cards" else _to_string)
+        encoded = [value.encode("utf-8") for value in values]
+        columns[name] = np.array(codes, dtype="<i4")
+        columns[f"{name}.offsets"] = np.cumsum([0] + [len(value) for value in encoded], dtype="<u8")
+        columns[f"{name}.data"] = np.frombuffer(b"".join(encoded), dtype="u1")
+
+    # Секции выравниваются, чтобы массивы в отображенной памяти были выровнены
+    offset = HEADER.size + SECTION.size * len(columns)
+    table, payload = [], []
+    for name, array in columns.items():
+        padding = -offset % ALIGNMENT
+        payload.append(b"\0" * padding)
+        offset += padding
+        table.append(SECTION.pack(name.encode("ascii"), array.dtype.str.encode("ascii"), offset, len(array)))
+        payload.append(array.tobytes())
+        offset += array.nbytes
+
+    body = b"".join(table) + b"".join(payload)
+    header = HEADER.pack(MAGIC, VERSION, 0, len(columns), len(rows), zlib.crc32(body))
+
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, file_path)
+    return len(rows)
+
+
+class Snapshot:
+    """
+    Снимок транзакций, отображенный в память только для чтения.
+
+    Столбцы — массивы NumPy поверх mmap без копирования: открытие не требует
+    разбора, а процессы, открывшие один файл, разделяют одну копию данных
+    в страничном кэше. Словари строк декодируются при первом обращении.
+    """
+
+    def __init__(self, file_path, verify=True):
+        """
+        Args:
+            file_path (str): Путь к файлу снимка.
+            verify (bool): Проверять контрольную сумму данных.
+
+        Raises:
+            SnapshotError: Если файл поврежден или версия не поддерживается.
+        """
+        import numpy as np
+
+        self._mmap = None
+        self._columns = {}
+        self._strings = {}
+        try:
+            with open(file_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mmap) < HEADER.size:
+                raise SnapshotError("Файл снимка слишком короткий")
+            magic, version, _, section_count, self._rows, checksum = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise SnapshotError("Файл не является снимком транзакций")
+            if version != VERSION:
+                raise SnapshotError(f"Неподдерживаемая версия снимка: {version}")
+            if verify:
+                with memoryview(self._mmap) as view:
+                    if zlib.crc32(view[HEADER.size:]) != checksum:
+                        raise SnapshotError("Контрольная сумма снимка не совпадает")
+
+            for i in range(section_count):
+                name, dtype, offset, count = SECTION.unpack_from(self._mmap, HEADER.size + i * SECTION.size)
+                self._columns[name.rstrip(b"\0").decode("ascii")] = np.frombuffer(
+                    self._mmap, dtype=dtype.rstrip(b"\0").decode("ascii"), count=count, offset=offset)
+        except SnapshotError:
+            self.close()
+            raise
+        except (struct.error, ValueError, TypeError) as e:
+            self.close()
+            raise SnapshotError(f"Файл снимка поврежден: {e}") from e
+
+    def __len__(self):
+        return self._rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает отображение.
+
+        Если вызывающий код еще держит массивы столбцов (или их срезы), отображение
+        не закрывается сразу: массивы остаются корректными, а память освобождается,
+        когда на них не останется ссылок.
+        """
+        # Массивы ссылаются на буфер mmap, поэтому освобождаем их до закрытия
+        self._columns = {}
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Есть внешние представления; mmap закроется при сборке мусора
+            self._mmap = None
+
+    @property
+    def dates(self):
+        """Даты операций в секундах от 1970-01-01, по возрастанию (MISSING_DATE для пустых)."""
+        return self._columns["dates"]
+
+    @property
+    def amounts(self):
+        """Суммы операций."""
+        return self._columns["amounts"]
+
+    def codes(self, name):
+        """Коды строкового столбца: "accounts", "cards", "categories" или "descriptions"."""
+        return self._columns[name]
+
+    def strings(self, name):
+        """Словарь уникальных значений строкового столбца."""
+        if name not in self._strings:
+            offsets = self._columns[f"{name}.offsets"].tolist()
+            data = self._columns[f"{name}.data"].tobytes()
+            self._strings[name] = [data[offsets[i]:offsets[i + 1]].decode("utf-8")
+                                   for i in range(len(offsets) - 1)]
+        return self._strings[name]
+
+    def range(self, start=None, end=None):
+        """
+        Находит строки за период двоичным поиском по датам.
+
+        Args:
+            start (datetime, optional): Начало периода включительно.
+            end (datetime, optional): Конец периода включительно.
+
+        Returns:
+            Tuple[int, int]: Индекс первой строки периода и индекс после последней.
+        """
+        import numpy as np
+
+        dates = self.dates
+        # Строки без даты стоят в начале и ни в один период не попадают
+        lo = int(np.searchsorted(dates, MISSING_DATE, side="right"))
+        hi = len(dates)
+        if start is not None:
+            lo = max(lo, int(np.searchsorted(dates, int((start - EPOCH).total_seconds()), side="left")))
+        if end is not None:
+            hi = int(np.searchsorted(dates, int((end - EPOCH).total_seconds()), side="right"))
+        return lo, max(lo, hi)
+
+    def to_transactions(self, start=None, end=None):
+        """
+        Восстанавливает транзакции в формате load_transactions.
+
+        Без периода возвращаются все строки, включая строки без даты; с периодом
+        словари создаются только для строк, попавших в него. Пустой счет не
+        восстанавливается: ключа ACCOUNT_COLUMN нет, как у транзакций одного файла.
+
+        Args:
+            start (datetime, optional): Начало периода включительно.
+            end (datetime, optional): Конец периода включительно.
+
+        Returns:
+            List[Dict]: Транзакции в хронологическом порядке.
+        """
+        if start is None and end is None:
+            lo, hi = 0, len(self)
+        else:
+            lo, hi = self.range(start, end)
+
+        nan = float("nan")
+        columns = [(column, self.strings(name), self.codes(name)[lo:hi].tolist(), name in OPTIONAL_COLUMNS)
+                   for name, column in STRING_COLUMNS.items()]
+        result = []
+        for i, (seconds, amount) in enumerate(zip(self.dates[lo:hi].tolist(), self.amounts[lo:hi].tolist())):
+            t = {
+                'Дата операции': (EPOCH + timedelta(seconds=seconds)).strftime(DATE_FORMAT)
+                if seconds != MISSING_DATE else nan,
+                'Сумма операции': amount,
+            }
+            for column, values, codes, optional in columns:
+                if codes[i] != MISSING_CODE:
+                    t[column] = values[codes[i]]
+                elif not optional:
+                    t[column] = nan
+            result.append(t)
+        return result
@@ -1,39 +1,336 @@
+import glob
+import hashlib
+import importlib
 import logging
 import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache, partial
 
-import pandas as pd
-import requests
-from dotenv import load_dotenv
+# Тяжелые зависимости загружаются при первом обращении, а не при импорте модуля:
+# так короткие CLI-команды и рабочие процессы стартуют быстрее.
+_LAZY_MODULES = {"pd": "pandas", "requests": "requests"}
 
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+CACHE_DIR_ENV = "BANKING_CACHE_DIR"
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+DEFAULT_FILE = os.path.join(DATA_DIR, "operations.xlsx")
+DEFAULT_CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+ACCOUNT_COLUMN = "Счет"
 
 
-def load_transactions(file_path=None):
+def __getattr__(name):
+    """Отложенно импортирует тяжелые зависимости (utils.pd, utils.requests)."""
+    if name in _LAZY_MODULES:
+        module = importlib.import_module(_LAZY_MODULES[name])
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Однократно загружает переменные окружения из .env."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def load_transactions(file_path=None, cache_dir=None, strict=False):
     """
     Загружает транзакции из Excel-файла.
 
     Args:
         file_path (str): Путь к Excel-файлу с транзакциями.
+        cache_dir (str, optional): Каталог дискового кэша. Если задан, повторные вызовы
+            читают уже разобранные транзакции из кэша и не парсят Excel.
+        strict (bool): Выбрасывать исключение, если файла нет или его не удалось
+            разобрать, вместо возврата пустого списка.
 
     Returns:
         List[Dict]: Список транзакций в формате словарей или пустой список при ошибке.
+
+    Raises:
+        Exception: При ошибке загрузки, если strict=True.
     """
 
     if not file_path:
-        file_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(file_dir, "..", "data", "operations.xlsx")
+        file_path = DEFAULT_FILE
 
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Файл {file_path} не найден")
 
+        cache_path = get_cache_path(file_path, cache_dir) if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "rb") as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logging.warning(f"Cache read error: {e}")
+
+        import pandas as pd
+
         df = pd.read_excel(file_path)
-        return df.to_dict(orient='records')
+        transactions = df.to_dict(orient='records')
+        if cache_path:
+            save_cache(cache_path, transactions)
+        return transactions
     except Exception as e:
         logging.error(f"Error loading transactions: {e}")
+        if strict:
+            raise
+        return []
+
+
+def get_cache_path(file_path, cache_dir):
+    """
+    Возвращает путь к файлу кэша для Excel-файла.
+
+    Ключ кэша учитывает путь, размер и время изменения файла, поэтому
+    при обновлении выписки кэш автоматически становится неактуальным.
+
+    Args:
+        file_path (str): Путь к Excel-файлу.
+        cache_dir (str): Каталог кэша.
+
+    Returns:
+        str: Путь к файлу кэша.
+    """
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{name}-{digest}.pkl")
+
+
+def save_cache(cache_path, transactions):
+    """Атомарно записывает транзакции в файл кэша."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(transactions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logging.warning(f"Cache write error: {e}")
+
+
+def find_statement_files(source):
+    """
+    Находит Excel-файлы выписок.
+
+    Args:
+        source (str | List[str]): Файл, каталог (ищется рекурсивно), шаблон glob
+            или список из них.
+
+    Returns:
+        List[str]: Пути к найденным файлам без повторов, в отсортированном порядке.
+    """
+    sources = [source] if isinstance(source, str) else list(source)
+    files = []
+    for item in sources:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, "**", "*.xlsx"), recursive=True))
+        elif glob.has_magic(item):
+            files.extend(glob.glob(item, recursive=True))
+        else:
+            files.append(item)
+    # Временные файлы Excel (~$name.xlsx) не являются выписками
+    return sorted({f for f in files if not os.path.basename(f).startswith("~$")})
+
+
+def get_source_root(source):
+    """
+    Возвращает каталог, относительно которого определяются счета выписок.
+
+    Для каталога это он сам, для шаблона glob — часть пути до первого сегмента
+    с подстановкой, для файла — его каталог. Для списка берется общий каталог
+    всех элементов, поэтому ["statements/7197", "statements/5091"] и
+    "statements/*/2021.xlsx" дают тот же корень, что и "statements".
+
+    Args:
+        source (str | List[str]): Файл, каталог, шаблон glob или список из них.
+
+    Returns:
+        str: Абсолютный путь к каталогу или None для пустого списка.
+    """
+    bases = []
+    for item in [source] if isinstance(source, str) else list(source):
+        if os.path.isdir(item):
+            base = item
+        elif glob.has_magic(item):
+            parts = os.path.normpath(item).split(os.sep)
+            prefix = []
+            for part in parts:
+                if glob.has_magic(part):
+                    break
+                prefix.append(part)
+            base = os.sep.join(prefix) or os.sep
+        else:
+            base = os.path.dirname(item)
+        bases.append(os.path.abspath(base or os.curdir))
+    return os.path.commonpath(bases) if bases else None
+
+
+def get_account_name(file_path, root=None):
+    """
+    Определяет счет по пути к выписке.
+
+    Для выписок во вложенных каталогах (root/<счет>/2021.xlsx) счетом считается
+    каталог первого уровня, иначе — имя файла без расширения.
+
+    Args:
+        file_path (str): Путь к выписке.
+        root (str, optional): Каталог, в котором искались выписки (см. get_source_root).
+
+    Returns:
+        str: Название счета.
+    """
+    if root and os.path.isdir(root):
+        parts = os.path.normpath(os.path.relpath(file_path, root)).split(os.sep)
+        if len(parts) > 1:
+            return parts[0]
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def get_transaction_date(transaction):
+    """
+    Возвращает дату операции транзакции.
+
+    Returns:
+        datetime: Дата операции или None, если ее нет или она некорректна.
+    """
+    try:
+        return datetime.strptime(transaction['Дата операции'], DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def sort_by_date(transactions, reverse=False):
+    """
+    Упорядочивает транзакции по дате операции.
+
+    Args:
+        transactions (Iterable[Dict]): Транзакции.
+        reverse (bool): От новых к старым (как в выписке) вместо хронологического порядка.
+
+    Returns:
+        List[Dict]: Новый список; записи без корректной даты идут в конце.
+    """
+    dated, undated = [], []
+    for t in transactions:
+        date = get_transaction_date(t)
+        (dated if date else undated).append((date, t))
+    # Выписки уже упорядочены, и сортировка сливает готовые серии почти за линейное время
+    dated.sort(key=lambda item: item[0], reverse=reverse)
+    return [t for _, t in dated] + [t for _, t in undated]
+
+
+def _parse_to_cache(file_path, cache_dir):
+    """Разбирает выписку в рабочем процессе в дисковый кэш и возвращает путь к файлу кэша."""
+    load_transactions(file_path, cache_dir=cache_dir)
+    return get_cache_path(file_path, cache_dir)
+
+
+def load_statements(source, cache_dir=None, workers=None, strict=False):
+    """
+    Загружает несколько выписок параллельно и объединяет их.
+
+    Разбор Excel нагружает процессор, поэтому файлы разбираются в отдельных
+    процессах. Процессы пишут результат в дисковый кэш (без cache_dir — во временный
+    каталог) и возвращают только путь к нему, так что строки не сериализуются
+    повторно для передачи в родительский процесс. Уже закэшированные выписки
+    не разбираются. Каждая транзакция помечается счетом (столбец ACCOUNT_COLUMN),
+    результат упорядочен по дате операции от новых к старым, как в выписке.
+
+    Args:
+        source (str | List[str]): Файл, каталог, шаблон glob или список из них.
+        cache_dir (str, optional): Каталог дискового кэша.
+        workers (int, optional): Число процессов; по умолчанию — по числу файлов,
+            но не больше числа ядер.
+        strict (bool): Выбрасывать исключение, если выписок не найдено или какую-то
+            из них не удалось загрузить.
+
+    Returns:
+        List[Dict]: Транзакции всех выписок или пустой список, если файлов нет.
+
+    Raises:
+        FileNotFoundError: Если выписок не найдено и strict=True.
+    """
+    files = find_statement_files(source)
+    if not files:
+        logging.error(f"Error loading statements: no files for {source}")
+        if strict:
+            raise FileNotFoundError(f"Выписки не найдены: {source}")
         return []
 
+    root = get_source_root(source)
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    with nullcontext(cache_dir) if cache_dir or workers <= 1 else tempfile.TemporaryDirectory() as batch_dir:
+        pending = [f for f in files if os.path.exists(f) and batch_dir
+                   and not os.path.exists(get_cache_path(f, batch_dir))]
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                for cache_path in executor.map(partial(_parse_to_cache, cache_dir=batch_dir), pending):
+                    logging.info(f"Parsed statement into {cache_path}")
+        loaded = [load_transactions(f, cache_dir=batch_dir, strict=strict) for f in files]
+
+    merged = []
+    for file_path, transactions in zip(files, loaded):
+        account = get_account_name(file_path, root)
+        for t in transactions:
+            t[ACCOUNT_COLUMN] = account
+        merged.extend(transactions)
+    return sort_by_date(merged, reverse=True)
+
+
+def filter_transactions_by_date(transactions, start=None, end=None):
+    """
+    Отбирает транзакции, попадающие в период [start, end].
+
+    Args:
+        transactions (List[Dict]): Список транзакций.
+        start (datetime, optional): Начало периода.
+        end (datetime, optional): Конец периода.
+
+    Returns:
+        List[Dict]: Транзакции за период; записи без корректной даты пропускаются.
+    """
+    if start is None and end is None:
+        return list(transactions)
+
+    result = []
+    for t in transactions:
+        try:
+            date = datetime.strptime(t['Дата операции'], DATE_FORMAT)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if (start is None or date >= start) and (end is None or date <= end):
+            result.append(t)
+    return result
+
+
+def get_card_key(card):
+    """
+    Приводит номер карты к ключу — последним 4 цифрам.
+
+    Args:
+        card: Номер карты из выписки (строка вида "*7197", число или NaN).
+
+    Returns:
+        str: Последние 4 цифры или None, если номер карты не указан.
+    """
+    # NaN не равен сам себе: так пустые ячейки Excel отсекаются без pandas
+    if card is None or card != card or not card or card == "*":
+        return None
+    if isinstance(card, (float, int)):
+        card = int(card)
+    return str(card)[-4:]
+
 
 def get_exchange_rates():
     """
@@ -42,6 +339,9 @@ def get_exchange_rates():
     Returns:
         Dict: Курсы валют относительно USD или пустой словарь при ошибке.
     """
+    import requests
+
+    load_env()
     url = f"https://v6.exchangerate-api.com/v6/{os.getenv('EXCHANGE_RATE_API_KEY')}/latest/USD"
     try:
         response = requests.get(url)
@@ -76,6 +376,8 @@ def get_sp500_data():
     Returns:
         List[Dict]: Последние 5 записей о S&P 500 или пустой список при ошибке
     """
+    import requests
+
     url = "https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol=SPX&apikey=demo "
     try:
         response = requests.get(url, timeout=10)
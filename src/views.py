@@ -53,12 +53,9 @@ import json
 import logging
 from datetime import datetime
 
-import pandas as pd
+from src.utils import (filter_transactions_by_date, get_card_key, get_exchange_rates, get_sp500_data,
+                       load_transactions)
 
-from src.utils import load_transactions, get_exchange_rates, get_sp500_data
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -80,22 +77,15 @@ def get_card_stats(transactions):
     card_groups = {}
 
     for t in transactions:
-        card = t.get('Номер карты', '')
         amount = t.get('Сумма операции', 0)
+        card_key = get_card_key(t.get('Номер карты', ''))  # Последние 4 цифры
 
         # Пропускаем ненужные записи
-        if pd.isna(card) or not card or card == "*":
+        if card_key is None:
             continue
         if amount >= 0:
             continue  # Пропускаем пополнения
 
-        # Преобразуем номер карты к строке
-        if isinstance(card, (float, int)):
-            card_str = str(int(card)) if card != "*" else str(card)
-        else:
-            card_str = str(card)
-
-        card_key = card_str[-4:]  # Последние 4 цифры
         if card_key not in card_groups:
             card_groups[card_key] = {"total_spent": 0, "cashback": 0}
 
@@ -140,12 +130,15 @@ def format_stock_prices(stocks):
     return [{"stock": k, "price": float(v)} for k, v in stocks[0].items()]
 
 
-def generate_report(date_str):
+def generate_report(date_str, transactions=None, exchange_rates=None, stock_prices=None):
     """
     Основная функция для генерации полного отчета
 
     Args:
         date_str (str): Дата в формате YYYY-MM-DD HH:MM:SS
+        transactions (List[Dict], optional): Транзакции; по умолчанию загружаются из Excel-файла
+        exchange_rates (Dict, optional): Курсы валют; по умолчанию запрашиваются через API
+        stock_prices (List[Dict], optional): Данные о S&P 500; по умолчанию запрашиваются через API
 
     Returns:
         Dict: JSON-словарь с результатами анализа
@@ -155,25 +148,48 @@ def generate_report(date_str):
     except ValueError:
         return {"error": "Неверный формат даты"}
 
-    # Фильтрация транзакций (начало месяца - текущая дата)
-    start_of_month = target_date.replace(day=1, hour=0, minute=0, second=0)
-    filtered_transactions = [
-        t for t in load_transactions()
-        if target_date >= datetime.strptime(t['Дата операции'], "%d.%m.%Y %H:%M:%S") >= start_of_month
-    ]
+    if transactions is None:
+        transactions = load_transactions()
+    if exchange_rates is None:
+        exchange_rates = get_exchange_rates()
+    if stock_prices is None:
+        stock_prices = get_sp500_data()
+
+    return {"greeting": get_greeting(), **build_report(target_date, transactions, exchange_rates, stock_prices)}
+
 
-    report = {
-        "greeting": get_greeting(),
+def build_report(target_date, transactions, exchange_rates, stock_prices, filtered=False):
+    """
+    Собирает разделы отчета, не зависящие от текущего времени (все, кроме приветствия)
+
+    Args:
+        target_date (datetime): Дата и время отчета
+        transactions (List[Dict]): Транзакции
+        exchange_rates (Dict): Курсы валют
+        stock_prices (List[Dict]): Данные о S&P 500
+        filtered (bool): Транзакции уже отобраны с начала месяца по target_date
+
+    Returns:
+        Dict: Статистика по картам, топ транзакций, курсы валют и цены акций
+    """
+    if filtered:
+        filtered_transactions = transactions
+    else:
+        # Фильтрация транзакций (начало месяца - текущая дата)
+        start_of_month = target_date.replace(day=1, hour=0, minute=0, second=0)
+        filtered_transactions = filter_transactions_by_date(transactions, start_of_month, target_date)
+
+    return {
         "cards": get_card_stats(filtered_transactions),
         "top_transactions": get_top_transactions(filtered_transactions),
-        "currency_rates": format_currency_rates(get_exchange_rates()),
-        "stock_prices": format_stock_prices(get_sp500_data())
+        "currency_rates": format_currency_rates(exchange_rates),
+        "stock_prices": format_stock_prices(stock_prices)
     }
 
-    return report
-
 
 if __name__ == "__main__":
+    # Настройка логирования
+    logging.basicConfig(level=logging.INFO)
     # Пример использования
     result = generate_report("2020-05-20 15:30:00")
     print(json.dumps(result, ensure_ascii=False, indent=2))
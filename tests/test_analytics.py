@@ -0,0 +1,91 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import TOTAL_KEY, SpendingIndex, rolling_spending
+
+
+@pytest.fixture
+def sample_transactions():
+    rng = np.random.default_rng(42)
+    categories = ["Супермаркеты", "Такси", "Фастфуд"]
+    cards = ["*7197", "*5091", float("nan")]
+    start = datetime(2021, 1, 1)
+    transactions = []
+    for _ in range(500):
+        moment = start + pd.Timedelta(minutes=int(rng.integers(0, 200 * 24 * 60)))
+        transactions.append({
+            "Дата операции": moment.strftime("%d.%m.%Y %H:%M:%S"),
+            "Сумма операции": round(float(rng.uniform(-3000, 1000)), 2),
+            "Категория": categories[rng.integers(0, 3)],
+            "Номер карты": cards[rng.integers(0, 3)],
+        })
+    return transactions
+
+
+def expected_rolling(transactions, window, key_func):
+    """Эталон: дневные суммы расходов и pandas rolling по календарным дням"""
+    df = pd.DataFrame(transactions)
+    df["date"] = pd.to_datetime(df["Дата операции"], format="%d.%m.%Y %H:%M:%S").dt.normalize()
+    df = df[df["Сумма операции"] < 0]
+    df["key"] = df.apply(key_func, axis=1)
+    df = df.dropna(subset=["key"])
+    daily = df.pivot_table(index="date", columns="key", values="Сумма операции", aggfunc="sum", fill_value=0)
+    daily = -daily.asfreq("D", fill_value=0)
+    return daily.rolling(window, min_periods=1).sum()
+
+
+# Результат совпадает с pandas rolling
+@pytest.mark.parametrize("window", [1, 7, 30, 90])
+@pytest.mark.parametrize("by,key_func", [
+    (None, lambda row: TOTAL_KEY),
+    ("category", lambda row: row["Категория"]),
+    ("card", lambda row: row["Номер карты"][-4:] if isinstance(row["Номер карты"], str) else None),
+])
+def test_rolling_matches_pandas(sample_transactions, window, by, key_func):
+    result = rolling_spending(sample_transactions, window, by=by)
+    expected = expected_rolling(sample_transactions, window, key_func)
+    result = result[sorted(result.columns)]
+    expected = expected[sorted(expected.columns)]
+    assert list(result.columns) == list(expected.columns)
+    assert (result.index == expected.index).all()
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), atol=1e-6)
+
+
+# Сумма за окно совпадает со строкой скользящей суммы
+def test_window_sum(sample_transactions):
+    index = SpendingIndex(sample_transactions, by="category")
+    rolling = index.rolling(30)
+    for day in ["2021-02-01", "2021-05-15", "2021-07-19"]:
+        expected = rolling.loc[day, "Такси"]
+        assert index.window_sum(date.fromisoformat(day), 30, "Такси") == pytest.approx(expected)
+
+
+# Окна вне данных и неизвестные группы
+def test_window_sum_out_of_range():
+    index = SpendingIndex([
+        {"Дата операции": "10.05.2021 12:00:00", "Сумма операции": -100.1, "Категория": "Такси"},
+        {"Дата операции": "12.05.2021 12:00:00", "Сумма операции": -50.2, "Категория": "Такси"},
+        {"Дата операции": "12.05.2021 13:00:00", "Сумма операции": 500, "Категория": "Пополнения"},
+    ])
+    assert index.window_sum(datetime(2021, 5, 12, 23, 0), 3) == 150.3
+    assert index.window_sum(date(2021, 5, 12), 2) == 50.2
+    assert index.window_sum(date(2021, 5, 30), 7) == 0
+    assert index.window_sum(date(2021, 5, 1), 7) == 0
+    assert index.window_sum(date(2021, 6, 1), 365) == 150.3
+    assert index.window_sum(date(2021, 5, 12), 7, "Такси") == 0
+
+
+# Некорректные параметры
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        SpendingIndex([], by="merchant")
+    with pytest.raises(ValueError):
+        SpendingIndex([]).rolling(0)
+
+
+# Пустой набор транзакций
+def test_empty_transactions():
+    assert rolling_spending([], 7).empty
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from src.anomalies import (AnomalyDetector, P2Quantile, RunningStats, detect_anomalies, load_detector,
+                           save_detector)
+
+
+def make_transaction(day, amount, category="Супермаркеты", card="*7197"):
+    return {"Дата операции": f"{day:02d}.05.2021 12:00:00", "Сумма операции": amount,
+            "Категория": category, "Номер карты": card, "Описание": "Колхоз"}
+
+
+# Среднее и дисперсия Уэлфорда совпадают с NumPy
+def test_running_stats():
+    values = np.random.default_rng(0).normal(500, 120, 1000)
+    stats = RunningStats()
+    for value in values:
+        stats.update(float(value))
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+
+
+# Дисперсия одного значения
+def test_running_stats_single_value():
+    stats = RunningStats()
+    stats.update(10)
+    assert stats.std == 0
+
+
+# Оценка P² близка к точному квантилю
+@pytest.mark.parametrize("p", [0.5, 0.9, 0.99])
+def test_p2_quantile(p):
+    values = np.random.default_rng(1).lognormal(6, 1, 20000)
+    estimator = P2Quantile(p)
+    for value in values:
+        estimator.update(float(value))
+    assert estimator.value == pytest.approx(np.quantile(values, p), rel=0.05)
+
+
+# На первых пяти значениях квантиль точный
+def test_p2_quantile_small_sample():
+    estimator = P2Quantile(0.5)
+    assert estimator.value is None
+    for value in [5, 1, 4, 2, 3]:
+        estimator.update(value)
+    assert estimator.value == 3
+
+
+# Некорректный уровень квантиля
+def test_p2_quantile_invalid_level():
+    with pytest.raises(ValueError):
+        P2Quantile(1)
+
+
+# Резкий рост расхода отмечается, обычные расходы — нет
+def test_detector_flags_spike():
+    detector = AnomalyDetector(quantile=None, min_count=5)
+    for day, amount in enumerate([-100, -110, -90, -105, -95, -100], start=1):
+        assert detector.update(make_transaction(day, amount)) is None
+
+    anomaly = detector.update(make_transaction(10, -1000))
+    assert anomaly["amount"] == 1000
+    assert anomaly["card"] == "7197"
+    assert {g["group"] for g in anomaly["groups"]} == {"category", "card"}
+    assert all(g["reasons"] == ["z_score"] for g in anomaly["groups"])
+
+
+# Пока статистики мало, транзакции не оцениваются; пополнения игнорируются
+def test_detector_warmup_and_income():
+    detector = AnomalyDetector(min_count=10)
+    assert detector.update(make_transaction(1, -100)) is None
+    assert detector.update(make_transaction(2, -100000)) is None
+    assert detector.score(make_transaction(3, 500000)) == []
+
+
+# Память пропорциональна числу групп, а не транзакций
+def test_detector_memory_bounded():
+    detector = AnomalyDetector()
+    for i in range(5000):
+        detector.update(make_transaction(i % 28 + 1, -float(i % 300 + 1), category=f"Категория {i % 3}"))
+    assert len(detector) == 4  # 3 категории и 1 карта
+
+
+# Пакетный поиск идет в хронологическом порядке и совпадает с инкрементальным
+def test_detect_anomalies_batch_and_incremental():
+    rng = np.random.default_rng(2)
+    transactions = [make_transaction(int(rng.integers(1, 29)), -float(rng.lognormal(5, 0.5)),
+                                     category=["Такси", "Фастфуд"][i % 2]) for i in range(300)]
+    transactions.append(make_transaction(28, -50000.0, category="Такси"))
+
+    batch = list(detect_anomalies(transactions))
+    assert any(a["amount"] == 50000 for a in batch)
+
+    ordered = sorted(transactions, key=lambda t: t["Дата операции"][:2])
+    detector = AnomalyDetector()
+    incremental = list(detect_anomalies(ordered[:150], detector, presorted=True))
+    incremental += list(detect_anomalies(ordered[150:], detector, presorted=True))
+    assert len(incremental) == len(batch)
+
+
+# Сохраненный детектор продолжает с новых транзакций, даже если история передана целиком
+def test_detector_state_resume(tmp_path):
+    rng = np.random.default_rng(3)
+    transactions = [make_transaction(day, -float(rng.lognormal(5, 0.5)), category=["Такси", "Фастфуд"][day % 2])
+                    for day in range(1, 29) for _ in range(5)]
+    transactions += [make_transaction(28, -50000.0, category="Такси")]
+    batch = list(detect_anomalies(transactions))
+
+    state_path = str(tmp_path / "state.pkl")
+    first = [t for t in transactions if int(t["Дата операции"][:2]) <= 14]
+    detector = load_detector(state_path)
+    resumed = list(detect_anomalies(first, detector))
+    save_detector(detector, state_path)
+    assert detector.last_date.day == 14
+
+    detector = load_detector(state_path, z_threshold=3.0)
+    resumed += list(detect_anomalies(transactions, detector, since=detector.last_date))
+    assert resumed == batch
+    assert len(detector) == 3
+
+
+# Другой уровень квантиля — статистика считается заново
+def test_detector_state_quantile_mismatch(tmp_path):
+    state_path = str(tmp_path / "state.pkl")
+    detector = AnomalyDetector(quantile=0.99)
+    detector.update(make_transaction(1, -100.0))
+    save_detector(detector, state_path)
+    assert len(load_detector(state_path, quantile=0.99, min_count=3)) == 2
+    assert load_detector(state_path, quantile=0.99, min_count=3).min_count == 3
+    assert len(load_detector(state_path, quantile=0.9)) == 0
+    assert len(load_detector(str(tmp_path / "missing.pkl"))) == 0
@@ -0,0 +1,101 @@
+import json
+import threading
+
+import pytest
+
+from src.budgets import BudgetTracker, check_budgets, load_budgets
+
+
+def make_transaction(date, amount, category="Такси", card="*7197"):
+    return {"Дата операции": f"{date} 12:00:00", "Сумма операции": amount, "Категория": category,
+            "Номер карты": card}
+
+
+# Пороги срабатывают один раз при достижении
+def test_thresholds_crossed_once():
+    tracker = BudgetTracker(categories={"Такси": 1000})
+    assert tracker.add(make_transaction("01.05.2021", -500)) == []
+
+    alerts = tracker.add(make_transaction("02.05.2021", -300))
+    assert [a["threshold"] for a in alerts] == [0.8]
+    assert alerts[0]["spent"] == 800
+    assert alerts[0]["percent"] == 80.0
+    assert alerts[0]["month"] == "2021-05"
+
+    assert tracker.add(make_transaction("03.05.2021", -100)) == []
+    assert [a["threshold"] for a in tracker.add(make_transaction("04.05.2021", -100))] == [1.0]
+    assert tracker.add(make_transaction("05.05.2021", -100)) == []
+
+
+# Одна транзакция может пройти несколько порогов
+def test_several_thresholds_at_once():
+    tracker = BudgetTracker(categories={"Такси": 1000}, thresholds=[1.0, 0.5, 0.8])
+    alerts = tracker.add(make_transaction("01.05.2021", -1500))
+    assert [a["threshold"] for a in alerts] == [0.5, 0.8, 1.0]
+
+
+# Новый месяц начинается с нуля
+def test_monthly_reset():
+    tracker = BudgetTracker(categories={"Такси": 1000})
+    tracker.add(make_transaction("31.05.2021", -900))
+    assert tracker.add(make_transaction("01.06.2021", -100)) == []
+    assert tracker.spent("category", "Такси", 2021, 5) == 900
+    assert tracker.spent("category", "Такси", 2021, 6) == 100
+
+
+# Бюджеты по картам, пополнения и группы без бюджета
+def test_card_budget():
+    tracker = BudgetTracker(cards={"*7197": 100})
+    assert tracker.add(make_transaction("01.05.2021", 1000)) == []
+    assert tracker.add(make_transaction("01.05.2021", -100, card="*5091")) == []
+    alerts = tracker.add(make_transaction("01.05.2021", -100))
+    assert [(a["group"], a["key"]) for a in alerts] == [("card", "7197"), ("card", "7197")]
+
+
+# Состояние бюджетов за месяц
+def test_status():
+    tracker = BudgetTracker(categories={"Такси": 1000}, cards={"7197": 2000})
+    tracker.add(make_transaction("01.05.2021", -500))
+    assert tracker.status(2021, 5) == [
+        {"group": "category", "key": "Такси", "limit": 1000, "spent": 500, "percent": 50.0},
+        {"group": "card", "key": "7197", "limit": 2000, "spent": 500, "percent": 25.0},
+    ]
+
+
+# Некорректный бюджет
+def test_invalid_limit():
+    with pytest.raises(ValueError):
+        BudgetTracker(categories={"Такси": 0})
+
+
+# Пакетная проверка идет в хронологическом порядке
+def test_check_budgets_chronological():
+    transactions = [make_transaction("03.05.2021", -600), make_transaction("01.05.2021", -300)]
+    alerts = list(check_budgets(transactions, BudgetTracker(categories={"Такси": 1000})))
+    assert [(a["date"], a["threshold"]) for a in alerts] == [("03.05.2021 12:00:00", 0.8)]
+
+
+# Параллельные обновления не теряют суммы
+def test_thread_safety():
+    tracker = BudgetTracker(categories={"Такси": 10 ** 9})
+
+    def worker():
+        for _ in range(1000):
+            tracker.add(make_transaction("01.05.2021", -1))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tracker.spent("category", "Такси", 2021, 5) == 4000
+
+
+# Загрузка настроек
+def test_load_budgets(tmp_path):
+    path = tmp_path / "budgets.json"
+    config = {"thresholds": [0.9], "categories": {"Такси": 3000}, "cards": {"7197": 50000}}
+    path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    assert load_budgets(str(path)) == config
+    assert BudgetTracker.from_config(config).thresholds == [0.9]
+    assert load_budgets(str(tmp_path / "missing.json")) == {}
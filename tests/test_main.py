@@ -0,0 +1,229 @@
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.main import _worker_state, main
+from src.utils import CACHE_DIR_ENV
+
+
+@pytest.fixture
+def sample_transactions():
+    return [
+        {"Дата операции": "31.12.2021 16:44:00", "Номер карты": "*7197", "Сумма операции": -160.89,
+         "Категория": "Супермаркеты", "Описание": "Колхоз"},
+        {"Дата операции": "30.12.2021 10:00:00", "Номер карты": "*5091", "Сумма операции": -300.0,
+         "Категория": "Такси", "Описание": "Яндекс Такси"},
+        {"Дата операции": "15.11.2021 09:00:00", "Номер карты": "*7197", "Сумма операции": -50.0,
+         "Категория": "Такси", "Описание": "Ситимобил"},
+    ]
+
+
+@pytest.fixture
+def mock_load(sample_transactions, tmp_path, monkeypatch):
+    # Кэш (в том числе таблицы для поиска) пишется во временный каталог, а не в data/.cache
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    with patch("src.main.utils.load_transactions", return_value=sample_transactions) as mock, \
+            patch("src.normalization.load_transactions", mock):
+        yield mock
+
+
+def run(capsys, *argv):
+    assert main(list(argv)) == 0
+    return capsys.readouterr().out
+
+
+# Поиск с фильтром по периоду
+def test_search(mock_load, capsys):
+    out = run(capsys, "search", "такси", "--start", "2021-12-01", "--format", "ndjson")
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert [t["Описание"] for t in lines] == ["Яндекс Такси"]
+
+
+# Статистика по картам в CSV
+def test_cards_csv(mock_load, capsys):
+    out = run(capsys, "cards", "--format", "csv")
+    assert out.splitlines()[0] == "last_digits,total_spent,cashback"
+    assert len(out.splitlines()) == 3
+
+
+# Суммы по дням недели: дата без времени включает весь день
+def test_weekday(mock_load, capsys):
+    data = json.loads(run(capsys, "weekday", "--date", "2021-12-31"))
+    assert data == [{"weekday": "Понедельник", "amount": -50.0}, {"weekday": "Четверг", "amount": -300.0},
+                    {"weekday": "Пятница", "amount": -160.89}]
+    data = json.loads(run(capsys, "weekday", "--date", "2021-12-31 12:00:00"))
+    assert {"weekday": "Пятница", "amount": -160.89} not in data
+
+
+# Неверная дата конца периода — ошибка разбора аргументов
+def test_weekday_invalid_date():
+    with pytest.raises(SystemExit):
+        main(["weekday", "--date", "31.12.2021"])
+
+
+# Пакетные отчеты на несколько дат без обращения к API
+def test_report_offline(mock_load, capsys):
+    with patch("src.main.utils.get_exchange_rates") as mock_rates:
+        data = json.loads(run(capsys, "report", "--offline", "--start", "2021-12-30", "--end", "2021-12-31"))
+    mock_rates.assert_not_called()
+    assert [r["date"] for r in data] == ["2021-12-30 23:59:59", "2021-12-31 23:59:59"]
+    assert len(data[1]["cards"]) == 2
+
+
+# Вывод в файл
+def test_output_file(mock_load, tmp_path, capsys):
+    output = tmp_path / "cards.json"
+    run(capsys, "cards", "-o", str(output))
+    assert len(json.loads(output.read_text(encoding="utf-8"))) == 2
+
+
+# Кэш можно отключить
+def test_no_cache(mock_load, capsys):
+    run(capsys, "cards", "--no-cache")
+    assert mock_load.call_args.kwargs["cache_dir"] is None
+
+
+# Неверная дата — ошибка разбора аргументов
+def test_invalid_date(capsys):
+    with pytest.raises(SystemExit):
+        main(["cards", "--start", "31.12.2021"])
+
+
+# Отсутствующий или поврежденный файл — ненулевой код возврата, а не пустой вывод
+@pytest.mark.parametrize("command", [["report", "--offline"], ["search", "такси"], ["cards"], ["rolling"]])
+@pytest.mark.parametrize("content", [None, b"not an xlsx"])
+def test_load_error(command, content, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    file_path = tmp_path / "operations.xlsx"
+    if content is not None:
+        file_path.write_bytes(content)
+    assert main([*command, "--file", str(file_path)]) == 1
+    assert capsys.readouterr().out == ""
+
+
+# Скользящие суммы расходов по картам
+def test_rolling(mock_load, capsys):
+    out = run(capsys, "rolling", "--window", "2", "--by", "card", "--start", "2021-12-31", "--format", "ndjson")
+    data = [json.loads(line) for line in out.splitlines()]
+    assert {"date": "2021-12-31", "group": "7197", "amount": 160.89} in data
+    assert {"date": "2021-12-31", "group": "5091", "amount": 300.0} in data
+
+
+# Поиск необычных расходов
+def test_anomalies(mock_load, capsys):
+    data = json.loads(run(capsys, "anomalies", "--min-count", "1", "--quantile", "0", "--z-threshold", "0"))
+    # Хронологический порядок: каждая транзакция сравнивается только с более ранними
+    assert [a["amount"] for a in data] == [300.0, 160.89]
+    assert data[0]["groups"][0]["key"] == "Такси"
+    assert data[1]["groups"][0]["key"] == "7197"
+
+
+# Поиск необычных расходов при разборе файлов
+def test_ingest_anomalies(mock_load, capsys):
+    out = run(capsys, "ingest", "a.xlsx", "--anomalies", "--min-count", "1", "--z-threshold", "0",
+              "--format", "ndjson")
+    assert [json.loads(line)["amount"] for line in out.splitlines()] == [300.0, 160.89]
+    mock_load.assert_called_once()
+
+
+# Повторный запуск продолжает статистику из каталога кэша и не выводит старые аномалии
+def test_ingest_anomalies_state(mock_load, sample_transactions, tmp_path, capsys):
+    argv = ["ingest", "a.xlsx", "--anomalies", "--min-count", "1", "--z-threshold", "0", "--format", "ndjson"]
+    assert [json.loads(line)["amount"] for line in run(capsys, *argv).splitlines()] == [300.0, 160.89]
+    assert (tmp_path / "cache" / "anomaly-state.pkl").exists()
+    assert run(capsys, *argv) == ""
+
+    mock_load.return_value = [{"Дата операции": "01.01.2022 10:00:00", "Номер карты": "*7197",
+                               "Сумма операции": -500.0, "Категория": "Такси"}] + sample_transactions
+    assert [json.loads(line)["amount"] for line in run(capsys, *argv).splitlines()] == [500.0]
+
+    # Без кэша и явного файла состояния — разовый пакетный поиск
+    assert len(run(capsys, *argv, "--no-cache").splitlines()) == 3
+
+
+# Выписки объединяются в хронологическом порядке, а не в порядке путей
+def test_ingest_anomalies_chronological(mock_load, capsys):
+    statements = {
+        "a.xlsx": [{"Дата операции": "10.01.2021 10:00:00", "Сумма операции": -1000.0, "Категория": "Такси"}],
+        "b.xlsx": [{"Дата операции": "01.12.2020 10:00:00", "Сумма операции": -100.0, "Категория": "Такси"},
+                   {"Дата операции": "02.12.2020 10:00:00", "Сумма операции": -110.0, "Категория": "Такси"}],
+    }
+    mock_load.side_effect = lambda path, cache_dir=None, strict=False: statements[path]
+    out = run(capsys, "ingest", "a.xlsx", "b.xlsx", "--anomalies", "--min-count", "2", "--format", "ndjson")
+    assert [json.loads(line)["date"] for line in out.splitlines()] == ["10.01.2021 10:00:00"]
+
+
+# Поиск с синонимами мерчантов
+def test_search_aliases(mock_load, tmp_path, capsys):
+    aliases = tmp_path / "aliases.json"
+    aliases.write_text(json.dumps({"Ситимобил": "Яндекс Такси"}, ensure_ascii=False), encoding="utf-8")
+    data = json.loads(run(capsys, "search", "яндекс", "--aliases", str(aliases)))
+    assert [t["Описание"] for t in data] == ["Яндекс Такси", "Ситимобил"]
+
+
+# Каталог выписок в --file загружается целиком
+def test_file_directory(tmp_path, capsys):
+    for account, amount in [("7197", -100), ("5091", -200)]:
+        (tmp_path / account).mkdir()
+        pd.DataFrame({"Дата операции": ["31.12.2021 10:00:00"], "Сумма операции": [amount],
+                      "Описание": ["Колхоз"], "Категория": ["Супермаркеты"]}).to_excel(
+            tmp_path / account / "2021.xlsx", index=False)
+    data = json.loads(run(capsys, "search", "колхоз", "--file", str(tmp_path), "--no-cache"))
+    assert sorted(t["Счет"] for t in data) == ["5091", "7197"]
+
+
+# Уведомления и состояние бюджетов
+def test_budgets(mock_load, tmp_path, capsys):
+    config = tmp_path / "budgets.json"
+    config.write_text(json.dumps({"categories": {"Такси": 300}}, ensure_ascii=False), encoding="utf-8")
+
+    alerts = json.loads(run(capsys, "budgets", "--config", str(config)))
+    assert [a["threshold"] for a in alerts] == [0.8, 1.0]
+    assert alerts[0]["date"] == "30.12.2021 10:00:00"
+
+    status = json.loads(run(capsys, "budgets", "--config", str(config), "--month", "2021-11"))
+    assert status == [{"group": "category", "key": "Такси", "limit": 300, "spent": 50.0, "percent": 16.7}]
+
+    out = run(capsys, "ingest", "a.xlsx", "--budgets", str(config), "--format", "ndjson")
+    assert len(out.splitlines()) == 2
+
+
+# Снимок сохраняется при разборе и заменяет Excel-файл в остальных командах
+def test_snapshot(mock_load, tmp_path, capsys):
+    path = str(tmp_path / "transactions.snap")
+    summary = json.loads(run(capsys, "ingest", "a.xlsx", "--save-snapshot", path))
+    assert summary == [{"snapshot": path, "files": 1, "rows": 3}]
+    mock_load.reset_mock()
+
+    data = json.loads(run(capsys, "search", "такси", "--snapshot", path))
+    assert [t["Сумма операции"] for t in data] == [-300.0, -50.0]
+
+    reports = json.loads(run(capsys, "report", "--snapshot", path, "--offline", "--date", "2021-12-31"))
+    assert sorted(c["last_digits"] for c in reports[0]["cards"]) == ["5091", "7197"]
+    mock_load.assert_not_called()
+    assert _worker_state == {}  # Снимок, открытый без пула процессов, закрыт
+
+
+# Повторный поиск берет нормализованную таблицу из кэша
+def test_search_table_cache(mock_load, capsys):
+    first = json.loads(run(capsys, "search", "такси"))
+    second = json.loads(run(capsys, "search", "такси"))
+    assert first == second
+    assert len(second) == 2
+    mock_load.assert_called_once()
+
+
+# Уведомления о бюджетах при разборе нескольких выписок относятся к транзакции, прошедшей порог
+def test_ingest_budgets_chronological(mock_load, tmp_path, capsys):
+    config = tmp_path / "budgets.json"
+    config.write_text(json.dumps({"categories": {"Такси": 150}}, ensure_ascii=False), encoding="utf-8")
+    statements = {
+        "a.xlsx": [{"Дата операции": "15.12.2020 10:00:00", "Сумма операции": -100.0, "Категория": "Такси"}],
+        "b.xlsx": [{"Дата операции": "01.12.2020 10:00:00", "Сумма операции": -100.0, "Категория": "Такси"}],
+    }
+    mock_load.side_effect = lambda path, cache_dir=None, strict=False: statements[path]
+    alerts = json.loads(run(capsys, "ingest", "a.xlsx", "b.xlsx", "--budgets", str(config)))
+    assert [(a["threshold"], a["date"]) for a in alerts] == [(0.8, "15.12.2020 10:00:00"),
+                                                             (1.0, "15.12.2020 10:00:00")]
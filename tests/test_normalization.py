@@ -0,0 +1,120 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.normalization import StringPool, TransactionTable, load_aliases, load_table, normalize_text
+from src.services import find_transactions, search_transactions
+
+
+def without_nan(transactions):
+    """NaN не равен сам себе, поэтому для сравнения словарей заменяем его на None."""
+    return [{k: None if v != v else v for k, v in t.items()} for t in transactions]
+
+
+@pytest.fixture
+def sample_transactions():
+    return [
+        {"Описание": "IP Yakubovskaya M. V.", "Категория": "Фастфуд", "Сумма операции": -100.0},
+        {"Описание": "Яндекс Такси", "Категория": "Такси", "Сумма операции": -300.0},
+        {"Описание": "IP Yakubovskaya M.V.", "Категория": "Фастфуд", "Сумма операции": -50.0},
+        {"Описание": " яндекс  такси ", "Категория": "Такси", "Сумма операции": -200.0},
+        {"Описание": "Перевод с карты", "Категория": float("nan"), "Сумма операции": 1000.0},
+        {"Описание": float("nan"), "Категория": "Супермаркеты", "Сумма операции": -10.0},
+    ]
+
+
+# Нормализация: регистр, пробелы, «ё»
+@pytest.mark.parametrize("value,expected", [
+    ("  Яндекс   Такси ", "яндекс такси"),
+    ("Перекрёсток", "перекресток"),
+    (float("nan"), ""),
+    (None, ""),
+])
+def test_normalize_text(value, expected):
+    assert normalize_text(value) == expected
+
+
+# Одинаковые значения получают один код и хранятся один раз
+def test_string_pool():
+    pool = StringPool(aliases={"IP Yakubovskaya M.V.": "IP Yakubovskaya M. V."})
+    codes = [pool.encode(v) for v in ["IP Yakubovskaya M. V.", "Колхоз", "ip yakubovskaya m.v.", "КОЛХОЗ", ""]]
+    assert codes == [0, 1, 0, 1, StringPool.MISSING]
+    assert pool.values == ["IP Yakubovskaya M. V.", "Колхоз"]
+    assert pool.decode(1) == "Колхоз"
+    assert pool.decode(StringPool.MISSING) is None
+    assert pool.code("Магнит") == StringPool.MISSING
+
+
+# Коды и строки в таблице транзакций
+def test_transaction_table(sample_transactions):
+    table = TransactionTable(sample_transactions, aliases={"IP Yakubovskaya M.V.": "IP Yakubovskaya M. V."})
+    assert len(table) == 6
+    assert len(table.descriptions) == 3
+    assert list(table.description_codes) == [0, 1, 0, 1, 2, StringPool.MISSING]
+    assert list(table.category_codes) == [0, 1, 0, 1, StringPool.MISSING, 2]
+    # Таблица хранит сами строки: словари собираются заново без изменений
+    assert without_nan(table.to_transactions()) == without_nan(sample_transactions)
+    assert table.to_transactions()[3]["Описание"] == " яндекс  такси "
+
+
+# Разные наборы ключей и типы значений восстанавливаются как были
+def test_transaction_table_columns():
+    transactions = [{"Описание": "Колхоз", "MCC": 1}, {"MCC": 1.0, "Кэшбэк": float("nan")}, {}]
+    restored = TransactionTable(transactions).to_transactions()
+    assert without_nan(restored) == [{"Описание": "Колхоз", "MCC": 1}, {"MCC": 1.0, "Кэшбэк": None}, {}]
+    assert [type(t.get("MCC")) for t in restored] == [int, float, type(None)]
+
+
+# Поиск по кодам совпадает с обычным поиском
+@pytest.mark.parametrize("query, expected", [
+    ("такси", 2), ("ЯКУБОВСКАЯ", 0), ("yakubovskaya", 2), ("фастфуд", 2), ("нет такого", 0), ("", 7),
+    ("яндекс такси", 2),  # Лишние пробелы в описании
+    ("елочные  игрушки", 1),  # «ё» и двойной пробел в запросе
+])
+def test_table_find_matches_plain_search(sample_transactions, query, expected):
+    transactions = sample_transactions + [{"Описание": "Ёлочные игрушки", "Категория": "Дом", "Сумма операции": -5.0}]
+    table = TransactionTable(transactions)
+    assert len(table.find(query)) == expected
+    assert without_nan(table.find(query)) == without_nan(find_transactions(query, transactions))
+
+
+# Поиск по таблице через сервис
+def test_search_transactions_table(sample_transactions):
+    data = json.loads(search_transactions("такси", TransactionTable(sample_transactions)))
+    assert [t["Сумма операции"] for t in data] == [-300.0, -200.0]
+
+
+# Группировка по мерчантам с учетом синонимов
+def test_spending_by_merchant(sample_transactions):
+    table = TransactionTable(sample_transactions, aliases={"IP Yakubovskaya M.V.": "IP Yakubovskaya M. V."})
+    assert table.spending_by_merchant() == {"Яндекс Такси": 500.0, "IP Yakubovskaya M. V.": 150.0}
+    assert len(table.by_merchant("ip yakubovskaya m.v.")) == 2
+    assert table.by_merchant("Магнит") == []
+
+
+# Загрузка синонимов из файла
+def test_load_aliases(tmp_path):
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"Yandex Taxi": "Яндекс Такси"}, ensure_ascii=False), encoding="utf-8")
+    assert load_aliases(str(path)) == {"Yandex Taxi": "Яндекс Такси"}
+    assert load_aliases(str(tmp_path / "missing.json")) == {}
+
+
+# Таблица сохраняется в кэш и при повторной загрузке не строится заново
+def test_load_table_cache(sample_transactions, tmp_path):
+    file_path = tmp_path / "operations.xlsx"
+    file_path.write_bytes(b"xlsx")
+    cache_dir = str(tmp_path / "cache")
+    aliases = {"IP Yakubovskaya M.V.": "IP Yakubovskaya M. V."}
+
+    with patch("src.normalization.load_transactions", return_value=sample_transactions) as mock_load:
+        table = load_table(str(file_path), cache_dir=cache_dir, aliases=aliases)
+        cached = load_table(str(file_path), cache_dir=cache_dir, aliases=aliases)
+        assert mock_load.call_count == 1
+        assert list(cached.description_codes) == list(table.description_codes)
+        assert cached.find("якубовская") == table.find("якубовская")
+
+        # Другие синонимы — другая таблица
+        load_table(str(file_path), cache_dir=cache_dir)
+        assert mock_load.call_count == 2
@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+
+from src.precompute import ReportPrecomputer, ReportStore
+from src.utils import get_transaction_date
+from src.views import generate_report
+
+TRANSACTIONS = [
+    {"Дата операции": "31.12.2021 16:44:00", "Номер карты": "*7197", "Сумма операции": -160.89,
+     "Категория": "Супермаркеты", "Описание": "Колхоз"},
+    {"Дата операции": "30.12.2021 10:00:00", "Номер карты": "*5091", "Сумма операции": -300.0,
+     "Категория": "Такси", "Описание": "Яндекс Такси"},
+    {"Дата операции": "01.12.2021 09:00:00", "Номер карты": "*7197", "Сумма операции": -50.0,
+     "Категория": "Такси", "Описание": "Ситимобил"},
+    {"Дата операции": "30.11.2021 09:00:00", "Номер карты": "*7197", "Сумма операции": -70.0,
+     "Категория": "Такси", "Описание": "Ситимобил"},
+]
+
+
+# Вытесняются отчеты, к которым дольше всего не обращались
+def test_store_retention():
+    store = ReportStore(max_entries=2)
+    store.put(date(2021, 12, 1), 1, "a")
+    store.put(date(2021, 12, 2), 1, "b")
+    assert store.get(date(2021, 12, 1), 1) == "a"
+    store.put(date(2021, 12, 3), 1, "c")
+    assert len(store) == 2
+    assert date(2021, 12, 2) not in store
+    assert store.get(date(2021, 12, 1), 2) is None  # Отчет другой версии данных не выдается
+
+    with pytest.raises(ValueError):
+        ReportStore(max_entries=0)
+
+
+# Заранее посчитанный отчет совпадает с отчетом по запросу
+def test_precompute_matches_generate_report():
+    precomputer = ReportPrecomputer(TRANSACTIONS, {"USD": 75.0}, [], days=3)
+    assert precomputer.precompute_days() == [date(2021, 12, 31), date(2021, 12, 30), date(2021, 12, 29)]
+    assert precomputer.precompute() == 3
+    assert precomputer.precompute() == 0
+
+    for day in precomputer.precompute_days():
+        report = precomputer.report(day)
+        assert report.pop("weekday")
+        expected = generate_report(f"{day} 23:59:59", TRANSACTIONS, {"USD": 75.0}, [])
+        assert report == expected
+
+
+# Отчет за день без готового расчета считается по запросу и сохраняется
+def test_on_demand_fallback():
+    precomputer = ReportPrecomputer(TRANSACTIONS, days=1)
+    report = precomputer.report(datetime(2021, 12, 1, 12, 0))
+    assert report["cards"] == [{"last_digits": "7197", "total_spent": 50.0, "cashback": 0.5}]
+    assert report["weekday"] == {"Вторник": -70.0, "Среда": -50.0}
+    assert date(2021, 12, 1) in precomputer.store
+
+    with patch("src.precompute.views.build_report") as build:
+        precomputer.report(date(2021, 12, 1))
+    build.assert_not_called()
+
+
+# Изменение выданного отчета не портит отчет в хранилище
+def test_report_is_a_copy():
+    precomputer = ReportPrecomputer(TRANSACTIONS, days=1)
+    precomputer.precompute()
+    report = precomputer.report(date(2021, 12, 31))
+    report["cards"][0]["total_spent"] = 0
+    report["top_transactions"].clear()
+    report["weekday"]["Пятница"] = 0
+    fresh = precomputer.report(date(2021, 12, 31))
+    assert fresh["cards"][0]["total_spent"] != 0
+    assert len(fresh["top_transactions"]) == 3
+    assert fresh["weekday"]["Пятница"] == -160.89
+
+
+# Готовые отчеты не разбирают даты транзакций повторно
+def test_precompute_skips_date_filter():
+    precomputer = ReportPrecomputer(TRANSACTIONS, days=3)
+    with patch("src.views.filter_transactions_by_date") as filter_by_date:
+        precomputer.precompute()
+    filter_by_date.assert_not_called()
+
+
+# Обновление данных делает готовые отчеты устаревшими
+def test_update_invalidates():
+    precomputer = ReportPrecomputer(TRANSACTIONS, days=1)
+    precomputer.precompute()
+    precomputer.update(exchange_rates={"EUR": 85.0})
+    assert precomputer.report(date(2021, 12, 31))["currency_rates"] == [{"currency": "EUR", "rate": 85.0}]
+
+    precomputer.update(transactions=TRANSACTIONS[1:])
+    assert precomputer.precompute_days() == [date(2021, 12, 30)]
+
+
+# Пока готовятся новые данные, отчеты выдаются по прежним, а одновременные обновления не теряются
+def test_update_does_not_block_readers():
+    precomputer = ReportPrecomputer(TRANSACTIONS, days=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_date(transaction):
+        started.set()
+        assert release.wait(5)
+        return get_transaction_date(transaction)
+
+    with patch("src.precompute.get_transaction_date", side_effect=slow_date):
+        updates = [threading.Thread(target=precomputer.update, kwargs={"transactions": TRANSACTIONS[1:]}),
+                   threading.Thread(target=precomputer.update, kwargs={"exchange_rates": {"EUR": 85.0}})]
+        updates[0].start()
+        assert started.wait(5)
+        updates[1].start()
+        # Читатели не ждут подготовки данных
+        assert precomputer.version == 1
+        assert precomputer.report(date(2021, 12, 31))["cards"][0]["last_digits"] == "7197"
+        release.set()
+        for thread in updates:
+            thread.join(5)
+
+    assert precomputer.version == 3
+    assert precomputer.precompute_days() == [date(2021, 12, 30)]
+    assert precomputer.report(date(2021, 12, 31))["currency_rates"] == [{"currency": "EUR", "rate": 85.0}]
+
+
+# Фоновый поток пересчитывает отчеты после каждого обновления
+def test_background_thread():
+    with ReportPrecomputer(TRANSACTIONS, days=5) as precomputer:
+        assert precomputer.wait_idle(timeout=5)
+        assert len(precomputer.store) == 5
+
+        precomputer.update(stock_prices=[{"AAPL": "150.0"}])
+        assert precomputer.wait_idle(timeout=5)
+        with patch("src.precompute.views.build_report") as build:
+            report = precomputer.report(date(2021, 12, 31))
+        build.assert_not_called()
+        assert report["stock_prices"] == [{"stock": "AAPL", "price": 150.0}]
+
+
+# Курсы обновляются в фоновом потоке по расписанию
+def test_rates_interval():
+    with patch("src.precompute.get_exchange_rates", return_value={"USD": 80.0}), \
+            patch("src.precompute.get_sp500_data", return_value=[]):
+        with ReportPrecomputer(TRANSACTIONS, days=1, rates_interval=0.01) as precomputer:
+            for _ in range(500):
+                if precomputer.version > 1:
+                    break
+                time.sleep(0.01)
+            assert precomputer.wait_idle(timeout=5)
+            report = precomputer.report(date(2021, 12, 31))
+    assert report["currency_rates"] == [{"currency": "USD", "rate": 80.0}]
+
+
+def test_empty():
+    precomputer = ReportPrecomputer()
+    assert precomputer.precompute_days() == []
+    assert precomputer.precompute() == 0
+    assert precomputer.report(date(2021, 12, 31))["cards"] == []
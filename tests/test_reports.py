@@ -78,14 +78,14 @@ def test_invalid_date_format():
                 "Дата операции": ["12.05.2021 13:57:38", "12.05.2021 13:15:26"],
                 "Сумма операции": [-7900, -120]
             }),
-            {"Понедельник": -8020}
+            {"Среда": -8020}
     ),
     (
             pd.DataFrame({
                 "Дата операции": ["13.05.2021 10:00:00", "14.05.2021 15:30:00"],
                 "Сумма операции": [-200, -300]
             }),
-            {"Вторник": -200, "Среда": -300}
+            {"Четверг": -200, "Пятница": -300}
     )
 ])
 def test_spending_by_weekday_parametrized(transactions, expected_days):
@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+import socket
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.serialization import dumps, write_frame, write_records
+
+
+@pytest.fixture
+def records():
+    return [
+        {"date": "01.05.2021", "amount": -100.5, "category": "Такси"},
+        {"date": "02.05.2021", "amount": float("nan"), "category": "Супермаркеты"},
+    ]
+
+
+# JSON-массив с заменой NaN на null
+def test_write_json(records):
+    stream = io.StringIO()
+    assert write_records(records, stream, "json") == 2
+    data = json.loads(stream.getvalue())
+    assert data[0]["category"] == "Такси"
+    assert data[1]["amount"] is None
+
+
+# Пустой результат — пустой массив
+def test_write_json_empty():
+    stream = io.StringIO()
+    write_records([], stream, "json")
+    assert json.loads(stream.getvalue()) == []
+
+
+# По одной записи на строку
+def test_write_ndjson(records):
+    stream = io.StringIO()
+    write_records(iter(records), stream, "ndjson")
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["amount"] == -100.5
+
+
+# CSV с заголовком и вложенными структурами в виде JSON
+def test_write_csv():
+    stream = io.StringIO()
+    write_records([{"date": "01.05.2021", "cards": [{"last_digits": "7197"}]}], stream, "csv")
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert rows[0]["date"] == "01.05.2021"
+    assert json.loads(rows[0]["cards"]) == [{"last_digits": "7197"}]
+
+
+# Неподдерживаемый формат
+def test_write_unknown_format(records):
+    with pytest.raises(ValueError):
+        write_records(records, io.StringIO(), "xml")
+
+
+# Кодировщик: orjson (если установлен) или стандартный json
+@pytest.fixture(params=["orjson", "json"])
+def backend(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        yield
+    else:
+        with patch("src.serialization.get_orjson", return_value=None):
+            yield
+
+
+# Компактный JSON по умолчанию, с отступами — по запросу
+def test_dumps_compact(backend):
+    assert dumps({"a": [1, 2], "б": "в"}) == '{"a":[1,2],"б":"в"}'
+    assert "\n" in dumps({"a": 1}, pretty=True)
+
+
+# Значения NumPy и pandas сериализуются без ручного преобразования
+def test_dumps_numpy_values(backend):
+    data = json.loads(dumps({"sum": np.float64(1.5), "count": np.int64(3), "values": np.array([1, 2]),
+                             "date": pd.Timestamp("2021-05-12"), "empty": float("nan")}))
+    assert data == {"sum": 1.5, "count": 3, "values": [1, 2], "date": "2021-05-12T00:00:00", "empty": None}
+
+
+# Пустые значения на любом уровне вложенности выводятся как null
+def test_dumps_nested_missing(backend):
+    nan = float("nan")
+    obj = {"a": {"b": nan}, "top": [{"category": nan, "date": pd.NaT}], "values": np.array([1.0, nan]),
+           "pair": (nan, 1), "date": pd.NaT}
+    assert dumps(obj) == '{"a":{"b":null},"top":[{"category":null,"date":null}],"values":[1.0,null],' \
+                         '"pair":[null,1],"date":null}'
+
+
+# Запись в двоичный поток (файл, сокет)
+def test_write_binary_stream(records):
+    stream = io.BytesIO()
+    write_records(records, stream, "ndjson")
+    assert json.loads(stream.getvalue().decode("utf-8").splitlines()[0])["category"] == "Такси"
+
+
+# Запись в сокет через sendall
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_write_socket(records, fmt):
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        assert write_records(records, sender, fmt) == 2
+        sender.shutdown(socket.SHUT_WR)
+        data = b"".join(iter(lambda: receiver.recv(4096), b""))
+    assert "Такси" in data.decode("utf-8")
+
+
+# Все форматы выводятся в UTF-8, даже если текстовый поток открыт в другой кодировке
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv"])
+@pytest.mark.parametrize("as_frame", [False, True])
+def test_write_utf8_regardless_of_stream_encoding(records, fmt, as_frame):
+    buffer = io.BytesIO()
+    stream = io.TextIOWrapper(buffer, encoding="cp1251", newline="")
+    write_records(pd.DataFrame(records) if as_frame else records, stream, fmt)
+    stream.flush()
+    assert "Супермаркеты" in buffer.getvalue().decode("utf-8")
+
+
+# CSV записывается несколькими блоками
+def test_write_csv_chunked():
+    records = [{"id": i, "description": "Колхоз"} for i in range(100)]
+    stream = io.BytesIO()
+    with patch("src.serialization.CHUNK_BYTES", 64):
+        assert write_records(iter(records), stream, "csv") == 100
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue().decode("utf-8"))))
+    assert [int(row["id"]) for row in rows] == list(range(100))
+
+
+# JSON-массив остается корректным при записи несколькими блоками
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_write_records_chunked(fmt):
+    records = [{"id": i, "description": "Колхоз"} for i in range(100)]
+    stream = io.StringIO()
+    with patch("src.serialization.CHUNK_BYTES", 64):
+        assert write_records(iter(records), stream, fmt) == 100
+    text = stream.getvalue()
+    data = json.loads(text) if fmt == "json" else [json.loads(line) for line in text.splitlines()]
+    assert data == records
+
+
+# DataFrame записывается напрямую по столбцам
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv"])
+def test_write_frame(fmt):
+    df = pd.DataFrame({"category": ["Такси", "Фастфуд", "Такси"], "amount": [-100.5, np.nan, -20.0]})
+    stream = io.BytesIO()
+    with patch("src.serialization.FRAME_CHUNK_ROWS", 2):
+        assert write_records(df, stream, fmt) == 3
+    text = stream.getvalue().decode("utf-8")
+    if fmt == "json":
+        data = json.loads(text)
+    elif fmt == "ndjson":
+        data = [json.loads(line) for line in text.splitlines()]
+    else:
+        data = list(csv.DictReader(io.StringIO(text)))
+        assert data[1]["amount"] == ""
+        return
+    assert data[1] == {"category": "Фастфуд", "amount": None}
+    assert len(data) == 3
+
+
+# Пустой DataFrame — пустой массив
+def test_write_frame_empty():
+    stream = io.StringIO()
+    write_frame(pd.DataFrame({"amount": []}), stream, "json")
+    assert json.loads(stream.getvalue()) == []
@@ -1,7 +1,7 @@
 import pytest
 import json
 import logging
-from src.services import search_transactions
+from src.services import find_transactions, search_transactions
 
 # Тестовые данные
 @pytest.fixture
@@ -88,3 +88,13 @@ def test_search_variants(sample_transactions, query, expected_count):
     else:
         data = json.loads(result)
         assert len(data) == expected_count
+
+
+# Пустые ячейки (NaN) не ломают поиск
+def test_find_transactions_skips_nan():
+    transactions = [
+        {"Описание": "Яндекс Такси", "Категория": float("nan")},
+        {"Описание": float("nan"), "Категория": "Такси"},
+        {"Описание": "Колхоз", "Категория": "Супермаркеты"},
+    ]
+    assert len(list(find_transactions("такси", transactions))) == 2
@@ -0,0 +1,124 @@
+import math
+from datetime import datetime
+
+import pytest
+
+from src.snapshot import HEADER, Snapshot, SnapshotError, write_snapshot
+
+TRANSACTIONS = [
+    {"Дата операции": "31.12.2021 16:44:00", "Номер карты": "*7197", "Сумма операции": -160.89,
+     "Категория": "Супермаркеты", "Описание": "Колхоз", "Статус": "OK"},
+    {"Дата операции": "30.12.2021 10:00:00", "Номер карты": float("nan"), "Сумма операции": 500.0,
+     "Категория": "Пополнения", "Описание": "Перевод"},
+    {"Дата операции": "15.11.2021 09:00:00", "Номер карты": "*7197", "Сумма операции": -50.0,
+     "Категория": float("nan"), "Описание": "Колхоз"},
+    {"Дата операции": float("nan"), "Номер карты": "*5091", "Сумма операции": -10.0,
+     "Категория": "Такси", "Описание": "Ёлка"},
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "transactions.snap"
+    assert write_snapshot(TRANSACTIONS, str(path)) == 4
+    return str(path)
+
+
+def is_missing(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+# Транзакции восстанавливаются в хронологическом порядке, строки без даты — первыми
+def test_round_trip(snapshot_path):
+    with Snapshot(snapshot_path) as snap:
+        assert len(snap) == 4
+        restored = snap.to_transactions()
+
+    assert [t["Сумма операции"] for t in restored] == [-10.0, -50.0, 500.0, -160.89]
+    assert is_missing(restored[0]["Дата операции"])
+    assert restored[3] == {"Дата операции": "31.12.2021 16:44:00", "Номер карты": "*7197",
+                           "Сумма операции": -160.89, "Категория": "Супермаркеты", "Описание": "Колхоз"}
+    assert is_missing(restored[2]["Номер карты"])
+    assert is_missing(restored[1]["Категория"])
+    assert restored[0]["Описание"] == "Ёлка"
+
+
+# Номер карты числом и счет сохраняются; пустой счет не восстанавливается
+def test_card_numbers_and_accounts(tmp_path):
+    path = str(tmp_path / "accounts.snap")
+    write_snapshot([
+        {"Дата операции": "31.12.2021 16:44:00", "Номер карты": 7197.0, "Сумма операции": -1.0, "Счет": "7197"},
+        {"Дата операции": "30.12.2021 10:00:00", "Номер карты": 5091, "Сумма операции": -2.0, "Описание": 42},
+        {"Дата операции": "29.12.2021 10:00:00", "Номер карты": "*5091", "Сумма операции": -3.0, "Счет": "5091"},
+    ], path)
+    with Snapshot(path) as snap:
+        restored = snap.to_transactions()
+        assert snap.strings("accounts") == ["5091", "7197"]
+    assert [t["Номер карты"] for t in restored] == ["*5091", "5091", "7197"]
+    assert [t.get("Счет") for t in restored] == ["5091", None, "7197"]
+    assert "Счет" not in restored[1]
+    assert restored[1]["Описание"] == "42"
+
+
+# Повторяющиеся строки хранятся в словаре один раз
+def test_string_dictionaries(snapshot_path):
+    with Snapshot(snapshot_path) as snap:
+        assert sorted(snap.strings("descriptions")) == ["Ёлка", "Колхоз", "Перевод"]
+        assert sorted(snap.strings("cards")) == ["*5091", "*7197"]
+        assert snap.codes("cards").tolist().count(-1) == 1
+
+
+# Выборка периода двоичным поиском
+def test_period(snapshot_path):
+    with Snapshot(snapshot_path) as snap:
+        assert snap.range() == (1, 4)
+        assert snap.range(datetime(2021, 12, 1), datetime(2021, 12, 31, 16, 44)) == (2, 4)
+        assert snap.range(datetime(2022, 1, 1)) == (4, 4)
+        december = snap.to_transactions(datetime(2021, 12, 1))
+    assert [t["Дата операции"] for t in december] == ["30.12.2021 10:00:00", "31.12.2021 16:44:00"]
+
+
+# Столбцы — представления отображенного в память файла без копирования
+def test_columns_are_read_only(snapshot_path):
+    with Snapshot(snapshot_path) as snap:
+        assert not snap.amounts.flags.writeable
+        assert not snap.amounts.flags.owndata
+        assert snap.dates.dtype == "int64"
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / "empty.snap")
+    assert write_snapshot([], path) == 0
+    with Snapshot(path) as snap:
+        assert snap.to_transactions() == []
+        assert snap.range(datetime(2021, 1, 1)) == (0, 0)
+
+
+# Поврежденные файлы и чужие версии отклоняются
+@pytest.mark.parametrize("offset, value", [
+    (0, b"X"),  # Сигнатура
+    (8, b"\x01"),  # Версия (прежний формат без счетов)
+    (HEADER.size + 100, b"\xff"),  # Данные (контрольная сумма)
+])
+def test_corrupted(snapshot_path, offset, value):
+    with open(snapshot_path, "r+b") as f:
+        f.seek(offset)
+        f.write(value)
+    with pytest.raises(SnapshotError):
+        Snapshot(snapshot_path)
+
+
+def test_truncated(tmp_path):
+    path = tmp_path / "short.snap"
+    path.write_bytes(b"BTXSNAP")
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
+
+
+# Закрытие снимка, пока вызывающий код держит срезы столбцов
+def test_close_with_exported_views(snapshot_path):
+    with Snapshot(snapshot_path) as snap:
+        dates = snap.dates[:2]
+        amounts = snap.amounts
+    assert dates.tolist()[1] > 0
+    assert amounts.tolist()[0] == -10.0
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = ["src.utils", "src.reports", "src.services", "src.views"]
+HEAVY_MODULES = ["pandas", "numpy", "requests", "dotenv"]
+
+# Бюджет на импорт всех модулей проекта, мкс (python -X importtime)
+IMPORT_BUDGET_US = 100_000
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+
+# Импорт модулей не тянет тяжелые зависимости
+def test_import_is_lazy():
+    code = f"import sys, {', '.join(MODULES)}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = run_python("-c", code)
+    assert result.stdout.strip() == ""
+
+
+# Импорт модулей не настраивает логирование
+def test_import_has_no_logging_side_effects():
+    code = f"import logging, {', '.join(MODULES)}; print(len(logging.getLogger().handlers))"
+    result = run_python("-c", code)
+    assert result.stdout.strip() == "0"
+
+
+# Время старта укладывается в бюджет
+def test_import_time_budget():
+    result = run_python("-X", "importtime", "-c", f"import {', '.join(MODULES)}")
+    total = 0
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] in MODULES:
+            total += int(parts[1])
+    assert 0 < total < IMPORT_BUDGET_US
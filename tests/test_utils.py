@@ -1,6 +1,8 @@
+import os
 from unittest.mock import patch, MagicMock
 
 import pandas as pd
+import pytest
 
 import src.utils as utils
 
@@ -36,6 +38,16 @@ def test_load_transactions_invalid_format(mock_read_excel):
     assert result == []
 
 
+@patch('src.utils.pd.read_excel')
+def test_load_transactions_strict(mock_read_excel):
+    """В строгом режиме ошибка загрузки не превращается в пустой список"""
+    with pytest.raises(FileNotFoundError):
+        utils.load_transactions("data/nonexistent.xlsx", strict=True)
+    mock_read_excel.side_effect = ValueError("Invalid format")
+    with pytest.raises(ValueError):
+        utils.load_transactions(strict=True)
+
+
 # Тест для get_exchange_rates
 @patch('src.utils.requests.get')
 def test_get_exchange_rates_success(mock_get):
@@ -99,3 +111,139 @@ def test_get_sp500_data_empty_response(mock_get):
     result = utils.get_sp500_data()
     assert result == []
 
+
+# Тесты для дискового кэша
+@patch('src.utils.pd.read_excel')
+def test_load_transactions_uses_cache(mock_read_excel, tmp_path):
+    """Повторная загрузка читает кэш и не парсит Excel"""
+    file_path = tmp_path / "operations.xlsx"
+    file_path.write_bytes(b"xlsx")
+    mock_read_excel.return_value = pd.DataFrame([{"Дата операции": "02.06.2019 17:46:06", "Сумма операции": -87}])
+
+    first = utils.load_transactions(str(file_path), cache_dir=str(tmp_path / "cache"))
+    second = utils.load_transactions(str(file_path), cache_dir=str(tmp_path / "cache"))
+
+    assert first == second
+    assert mock_read_excel.call_count == 1
+
+
+@patch('src.utils.pd.read_excel')
+def test_load_transactions_cache_invalidated(mock_read_excel, tmp_path):
+    """Изменение файла делает кэш неактуальным"""
+    file_path = tmp_path / "operations.xlsx"
+    file_path.write_bytes(b"xlsx")
+    mock_read_excel.return_value = pd.DataFrame([{"Сумма операции": -87}])
+    utils.load_transactions(str(file_path), cache_dir=str(tmp_path))
+
+    file_path.write_bytes(b"new xlsx")
+    utils.load_transactions(str(file_path), cache_dir=str(tmp_path))
+
+    assert mock_read_excel.call_count == 2
+
+
+# Тест для filter_transactions_by_date
+def test_filter_transactions_by_date():
+    """Фильтрация по периоду пропускает записи без корректной даты"""
+    from datetime import datetime
+
+    transactions = [
+        {"Дата операции": "01.05.2021 10:00:00"},
+        {"Дата операции": "15.05.2021 10:00:00"},
+        {"Дата операции": "01.06.2021 10:00:00"},
+        {"Дата операции": float("nan")},
+        {},
+    ]
+    result = utils.filter_transactions_by_date(transactions, datetime(2021, 5, 10), datetime(2021, 5, 31))
+    assert result == [{"Дата операции": "15.05.2021 10:00:00"}]
+    assert len(utils.filter_transactions_by_date(transactions)) == 5
+
+
+# Тест для get_card_key
+def test_get_card_key():
+    """Ключ карты — последние 4 цифры, пустые значения отсекаются"""
+    assert utils.get_card_key("*7197") == "7197"
+    assert utils.get_card_key(1234567890123456.0) == "3456"
+    assert utils.get_card_key(float("nan")) is None
+    assert utils.get_card_key("") is None
+    assert utils.get_card_key("*") is None
+
+
+# Тесты для загрузки нескольких выписок
+def write_statement(path, dates, amounts):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"Дата операции": dates, "Сумма операции": amounts}).to_excel(path, index=False)
+
+
+def test_find_statement_files(tmp_path):
+    """Каталог просматривается рекурсивно, шаблоны раскрываются"""
+    for name in ["7197/2020.xlsx", "7197/2021.xlsx", "5091/2021.xlsx", "notes.txt", "~$2021.xlsx"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+
+    files = utils.find_statement_files(str(tmp_path))
+    assert [os.path.relpath(f, tmp_path) for f in files] == [
+        os.path.join("5091", "2021.xlsx"), os.path.join("7197", "2020.xlsx"), os.path.join("7197", "2021.xlsx")]
+    assert len(utils.find_statement_files(str(tmp_path / "*" / "2021.xlsx"))) == 2
+
+
+def test_get_account_name(tmp_path):
+    """Счет — каталог первого уровня или имя файла"""
+    assert utils.get_account_name(str(tmp_path / "7197" / "2021.xlsx"), str(tmp_path)) == "7197"
+    assert utils.get_account_name(str(tmp_path / "card_5091.xlsx"), str(tmp_path)) == "card_5091"
+    assert utils.get_account_name("data/operations.xlsx") == "operations"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_statements(tmp_path, workers):
+    """Выписки объединяются, помечаются счетом и упорядочиваются по дате"""
+    write_statement(tmp_path / "7197" / "2021.xlsx", ["31.12.2021 10:00:00", "01.06.2021 10:00:00"], [-100, -200])
+    write_statement(tmp_path / "7197" / "2020.xlsx", ["31.12.2020 10:00:00"], [-300])
+    write_statement(tmp_path / "5091" / "2021.xlsx", ["15.07.2021 10:00:00"], [-400])
+
+    result = utils.load_statements(str(tmp_path), workers=workers)
+
+    assert [t["Сумма операции"] for t in result] == [-100, -400, -200, -300]
+    assert [t[utils.ACCOUNT_COLUMN] for t in result] == ["7197", "5091", "7197", "7197"]
+
+
+@pytest.mark.parametrize("source", [
+    lambda root: str(root / "*" / "*.xlsx"),
+    lambda root: str(root / "**" / "*.xlsx"),
+    lambda root: [str(root / "7197"), str(root / "5091")],
+    lambda root: [str(root / account / f"{year}.xlsx") for account, year in [("7197", 2021), ("7197", 2020),
+                                                                             ("5091", 2021)]],
+])
+def test_load_statements_account_sources(tmp_path, source):
+    """Счет определяется относительно корня шаблона или общего каталога списка"""
+    write_statement(tmp_path / "7197" / "2021.xlsx", ["31.12.2021 10:00:00"], [-100])
+    write_statement(tmp_path / "7197" / "2020.xlsx", ["31.12.2020 10:00:00"], [-300])
+    write_statement(tmp_path / "5091" / "2021.xlsx", ["15.07.2021 10:00:00"], [-400])
+
+    result = utils.load_statements(source(tmp_path), workers=1)
+
+    assert [t[utils.ACCOUNT_COLUMN] for t in result] == ["7197", "5091", "7197"]
+
+
+def test_load_statements_parallel_cache(tmp_path):
+    """Рабочие процессы пишут выписки в кэш; повторная загрузка их не разбирает"""
+    statements, cache_dir = tmp_path / "statements", tmp_path / "cache"
+    write_statement(statements / "7197.xlsx", ["31.12.2021 10:00:00"], [-100])
+    write_statement(statements / "5091.xlsx", ["30.12.2021 10:00:00"], [-200])
+
+    first = utils.load_statements(str(statements), cache_dir=str(cache_dir), workers=2)
+    assert len(os.listdir(cache_dir)) == 2
+
+    with patch('src.utils.pd.read_excel') as mock_read_excel:
+        second = utils.load_statements(str(statements), cache_dir=str(cache_dir), workers=2)
+    mock_read_excel.assert_not_called()
+    assert second == first == [
+        {"Дата операции": "31.12.2021 10:00:00", "Сумма операции": -100, utils.ACCOUNT_COLUMN: "7197"},
+        {"Дата операции": "30.12.2021 10:00:00", "Сумма операции": -200, utils.ACCOUNT_COLUMN: "5091"},
+    ]
+
+
+def test_load_statements_no_files(tmp_path):
+    """Пустой каталог — пустой список"""
+    assert utils.load_statements(str(tmp_path)) == []
+    with pytest.raises(FileNotFoundError):
+        utils.load_statements(str(tmp_path), strict=True)